@@ -27,7 +27,12 @@ setup(
     author='Karl Hobley',
     author_email='karlhobley10@gmail.com',
     url='https://github.com/torchbox/wagtailapi',
-    packages=['wagtailapi'],
+    packages=[
+        'wagtailapi',
+        'wagtailapi.migrations',
+        'wagtailapi.management',
+        'wagtailapi.management.commands',
+    ],
     include_package_data=True,
     license='BSD',
     classifiers=[
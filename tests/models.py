@@ -270,6 +270,7 @@ class BlogEntryPage(Page):
 
     search_fields = Page.search_fields + (
         index.SearchField('body'),
+        index.FilterField('date'),
     )
 
     def get_blog_index(self):
@@ -0,0 +1,225 @@
+import json
+import datetime
+import mock
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.core.urlresolvers import reverse
+from django.utils import timezone
+
+from wagtail.wagtailcore.models import Page
+from wagtail.wagtailimages.models import get_image_model
+from wagtail.wagtaildocs.models import Document
+
+from wagtailapi import signal_handlers
+from wagtailapi.api import ChangesAPIEndpoint
+from wagtailapi.brokers import DatabaseBroker, InProcessBroker
+from wagtailapi.models import ChangeEvent
+
+
+@override_settings(WAGTAILAPI_CHANGES_BROKER='wagtailapi.brokers.DatabaseBroker', WAGTAILAPI_CHANGES_STREAM_DURATION=0)
+class TestChangeFeed(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    @classmethod
+    def setUpClass(cls):
+        signal_handlers.register_change_feed_signal_handlers()
+
+    @classmethod
+    def tearDownClass(cls):
+        signal_handlers.unregister_change_feed_signal_handlers()
+
+    def get_response(self, last_event_id=None, **params):
+        headers = {}
+        if last_event_id is not None:
+            headers['HTTP_LAST_EVENT_ID'] = str(last_event_id)
+
+        return self.client.get(reverse('wagtailapi_v1_changes:listing'), params, **headers)
+
+    def get_events(self, response):
+        content = b''.join(response.streaming_content).decode('UTF-8')
+
+        events = []
+        for message in content.split('\n\n'):
+            lines = dict(line.split(': ', 1) for line in message.splitlines() if not line.startswith(':'))
+
+            if 'data' in lines:
+                events.append((int(lines['id']), lines['event'], json.loads(lines['data'])))
+
+        return events
+
+
+    # BASIC TESTS
+
+    def test_status_code(self):
+        response = self.get_response()
+        self.assertEqual(response.status_code, 200)
+
+    def test_content_type_header(self):
+        response = self.get_response()
+        self.assertEqual(response['Content-type'], 'text/event-stream')
+
+    def test_no_events_without_last_event_id(self):
+        Page.objects.get(id=16).save_revision().publish()
+
+        response = self.get_response()
+        self.assertEqual(self.get_events(response), [])
+
+
+    # EVENTS
+
+    def test_publish_page(self):
+        Page.objects.get(id=16).save_revision().publish()
+
+        response = self.get_response(last_event_id=0)
+        events = self.get_events(response)
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][1], 'published')
+        self.assertEqual(events[0][2], {'endpoint': 'pages', 'id': 16, 'action': 'published'})
+
+    def test_unpublish_page(self):
+        Page.objects.get(id=16).unpublish()
+
+        response = self.get_response(last_event_id=0)
+        events = self.get_events(response)
+
+        self.assertEqual([event[2] for event in events], [{'endpoint': 'pages', 'id': 16, 'action': 'unpublished'}])
+
+    def test_publish_private_page_isnt_sent(self):
+        Page.objects.get(id=5).view_restrictions.create(password='test')
+        Page.objects.get(id=16).save_revision().publish()
+
+        response = self.get_response(last_event_id=0)
+        self.assertEqual(self.get_events(response), [])
+
+    def test_unpublish_private_page_isnt_sent(self):
+        Page.objects.get(id=5).view_restrictions.create(password='test')
+        Page.objects.get(id=16).unpublish()
+
+        response = self.get_response(last_event_id=0)
+        self.assertEqual(self.get_events(response), [])
+
+    def test_publish_then_unpublish_page(self):
+        Page.objects.get(id=16).save_revision().publish()
+        Page.objects.get(id=16).unpublish()
+
+        response = self.get_response(last_event_id=0)
+        events = self.get_events(response)
+
+        # The page isn't live any more so only the unpublish is sent
+        self.assertEqual([event[2] for event in events], [{'endpoint': 'pages', 'id': 16, 'action': 'unpublished'}])
+
+    def test_save_and_delete_image(self):
+        image = get_image_model().objects.get(id=5)
+        image.save()
+        image.delete()
+
+        response = self.get_response(last_event_id=0)
+        events = self.get_events(response)
+
+        self.assertEqual([event[2] for event in events], [
+            {'endpoint': 'images', 'id': 5, 'action': 'saved'},
+            {'endpoint': 'images', 'id': 5, 'action': 'deleted'},
+        ])
+
+    def test_delete_document(self):
+        Document.objects.get(id=1).delete()
+
+        response = self.get_response(last_event_id=0)
+        events = self.get_events(response)
+
+        self.assertEqual([event[2] for event in events], [{'endpoint': 'documents', 'id': 1, 'action': 'deleted'}])
+
+    def test_resume_from_last_event_id(self):
+        Page.objects.get(id=16).save_revision().publish()
+        Page.objects.get(id=18).save_revision().publish()
+
+        first_event_id = ChangeEvent.objects.get(object_id=16).id
+
+        response = self.get_response(last_event_id=first_event_id)
+        events = self.get_events(response)
+
+        self.assertEqual([event[2]['id'] for event in events], [18])
+
+    def test_last_event_id_query_parameter(self):
+        Page.objects.get(id=16).save_revision().publish()
+
+        response = self.get_response(last_event_id=0)
+        query_response = self.client.get(reverse('wagtailapi_v1_changes:listing'), {'last_event_id': 0})
+
+        self.assertEqual(self.get_events(response), self.get_events(query_response))
+
+    def test_invalid_last_event_id_gives_error(self):
+        response = self.get_response(last_event_id='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "last_event_id must be a positive integer"})
+
+    def test_unknown_parameter_gives_error(self):
+        response = self.get_response(foo='bar')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "query parameter is not an operation or a recognised field: foo"})
+
+    @override_settings(WAGTAILAPI_CHANGES_BROKER=None)
+    def test_disabled_gives_404(self):
+        response = self.get_response()
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(WAGTAILAPI_CHANGES_STREAM_DURATION=None)
+    def test_stream_stays_open_when_duration_is_none(self):
+        response = self.get_response()
+
+        with mock.patch.object(ChangesAPIEndpoint, 'keepalive_interval', 0):
+            messages = [next(response.streaming_content) for i in range(3)]
+
+        self.assertEqual([message.decode('UTF-8') for message in messages], ['retry: 5000\n\n', ': keepalive\n\n', ': keepalive\n\n'])
+
+
+class TestChangesAPIEndpoint(TestCase):
+    def test_stream_duration_is_bounded_by_default(self):
+        self.assertEqual(ChangesAPIEndpoint().get_stream_duration(), 300)
+
+    @override_settings(WAGTAILAPI_CHANGES_STREAM_DURATION=None)
+    def test_unbounded_stream_duration(self):
+        self.assertIsNone(ChangesAPIEndpoint().get_stream_duration())
+
+
+@override_settings(WAGTAILAPI_CHANGES_BROKER='wagtailapi.brokers.DatabaseBroker')
+class TestDatabaseBroker(TestCase):
+    def test_old_events_are_removed(self):
+        broker = DatabaseBroker()
+        broker.publish('pages', 16, 'published')
+        ChangeEvent.objects.update(created_at=timezone.now() - datetime.timedelta(days=31))
+
+        broker.publish('pages', 18, 'published')
+
+        self.assertEqual(list(ChangeEvent.objects.values_list('object_id', flat=True)), [18])
+
+
+class TestInProcessBroker(TestCase):
+    def test_get_events(self):
+        broker = InProcessBroker()
+        broker.publish('pages', 16, 'published')
+        broker.publish('pages', 18, 'published')
+
+        events = broker.get_events(1, 0)
+
+        self.assertEqual([(event.id, event.object_id) for event in events], [(2, 18)])
+
+    def test_get_events_times_out(self):
+        broker = InProcessBroker()
+
+        self.assertEqual(broker.get_events(0, 0.01), [])
+
+    def test_unknown_event_id_gets_all_events(self):
+        # Clients may have seen higher ids before the process restarted
+        broker = InProcessBroker()
+        broker.publish('pages', 16, 'published')
+
+        events = broker.get_events(500, 0)
+
+        self.assertEqual([event.object_id for event in events], [16])
@@ -0,0 +1,277 @@
+import os
+import json
+import shutil
+import tempfile
+
+import mock
+import six
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.core.urlresolvers import reverse
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from wagtail.wagtailcore.models import Page
+from wagtail.wagtailimages.models import get_image_model
+
+from wagtailapi import signal_handlers
+from wagtailapi.models import DocumentMetadata
+
+
+class InProcessPool(object):
+    # Runs the jobs of a multiprocessing.Pool one after another in this process
+    def __init__(self, processes):
+        self.processes = processes
+
+    def map(self, func, iterable):
+        return [func(args) for args in iterable]
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class TestExportAPINDJSON(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def export(self, **options):
+        stdout = six.StringIO()
+        call_command('export_api_ndjson', stdout=stdout, stderr=six.StringIO(), **options)
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def export_to_file(self, filename, **options):
+        path = os.path.join(self.output_dir, filename)
+        call_command('export_api_ndjson', output=path, stdout=six.StringIO(), stderr=six.StringIO(), **options)
+
+        with open(path) as output:
+            return output.read().splitlines()
+
+    def export_parallel(self, filename, **options):
+        with mock.patch('wagtailapi.management.commands.export_api_ndjson.connection') as connection:
+            with mock.patch('wagtailapi.management.commands.export_api_ndjson.multiprocessing.Pool', InProcessPool):
+                lines = self.export_to_file(filename, **options)
+
+        # The database connection must not be shared with the worker processes
+        self.assertTrue(connection.close.called)
+
+        return lines
+
+    def test_export(self):
+        pages = self.export(endpoint='pages')
+
+        # The root page is invisible over the API
+        self.assertEqual(len(pages), Page.objects.live().public().count() - 1)
+        self.assertEqual([page['id'] for page in pages], sorted(page['id'] for page in pages))
+
+    def test_export_matches_detail_view(self):
+        pages = self.export(endpoint='pages', chunk_size=3)
+        page = [page for page in pages if page['id'] == 16][0]
+
+        response = self.client.get(reverse('wagtailapi_v1_pages:detail', args=(16, )))
+        self.assertEqual(page, json.loads(response.content.decode('UTF-8')))
+
+    def test_export_fields(self):
+        pages = self.export(endpoint='pages', fields='title,date')
+
+        self.assertEqual(set(pages[0].keys()), set(['id', 'meta', 'title']))
+
+        blog_entry = [page for page in pages if page['id'] == 16][0]
+        self.assertEqual(blog_entry['date'], '2013-12-02')
+
+    def test_export_workers(self):
+        lines = self.export_parallel('pages.ndjson', endpoint='pages', workers=3, chunk_size=2)
+
+        self.assertEqual(lines, self.export_to_file('pages-single.ndjson', endpoint='pages'))
+
+    def test_export_workers_with_fields(self):
+        lines = self.export_parallel('pages.ndjson', endpoint='pages', fields='title,date', workers=2)
+
+        self.assertEqual(lines, self.export_to_file('pages-single.ndjson', endpoint='pages', fields='title,date'))
+
+    def test_export_more_workers_than_ids(self):
+        # Some of the id ranges are empty
+        image_ids = get_image_model().objects.values_list('id', flat=True)
+        min_id, max_id = min(image_ids), max(image_ids)
+        lines = self.export_parallel('images.ndjson', endpoint='images', workers=max_id - min_id + 5)
+
+        self.assertEqual(lines, self.export_to_file('images-single.ndjson', endpoint='images'))
+        self.assertEqual(len(lines), 12)
+
+    def test_export_workers_removes_part_files(self):
+        self.export_parallel('images.ndjson', endpoint='images', workers=3)
+
+        self.assertEqual(os.listdir(self.output_dir), ['images.ndjson'])
+
+    def test_export_workers_empty_endpoint(self):
+        get_image_model().objects.all().delete()
+
+        lines = self.export_to_file('images.ndjson', endpoint='images', workers=3)
+
+        self.assertEqual(lines, [])
+
+    def test_export_workers_without_output(self):
+        with self.assertRaises(CommandError):
+            self.export(endpoint='pages', workers=2)
+
+    def test_export_unknown_field(self):
+        with self.assertRaises(CommandError):
+            self.export(endpoint='pages', fields='title,foo')
+
+    def test_export_images(self):
+        images = self.export(endpoint='images')
+        self.assertEqual(len(images), 12)
+
+    def test_export_documents(self):
+        documents = self.export(endpoint='documents')
+        self.assertEqual(len(documents), 12)
+
+    def test_export_documents_file_metadata(self):
+        DocumentMetadata.objects.create(document_id=1, file_name='documents/test.pdf', file_size=1234, content_type='application/pdf', checksum='abc')
+
+        documents = self.export(endpoint='documents', fields='title,file_size,content_type,checksum')
+        document = [document for document in documents if document['id'] == 1][0]
+
+        self.assertEqual(document['file_size'], 1234)
+        self.assertEqual(document['content_type'], 'application/pdf')
+        self.assertEqual(document['checksum'], 'abc')
+
+    def test_export_documents_matches_detail_view(self):
+        DocumentMetadata.objects.create(document_id=1, file_name='documents/test.pdf', file_size=1234, content_type='application/pdf', checksum='abc')
+
+        documents = self.export(endpoint='documents')
+        document = [document for document in documents if document['id'] == 1][0]
+
+        response = self.client.get(reverse('wagtailapi_v1_documents:detail', args=(1, )))
+        self.assertEqual(document, json.loads(response.content.decode('UTF-8')))
+
+
+class TestPrerenderAPI(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def prerender(self, **options):
+        call_command('prerender_api', output_dir=self.output_dir, stdout=six.StringIO(), **options)
+
+    def read_file(self, *path):
+        with open(os.path.join(self.output_dir, *path), 'rb') as f:
+            return f.read()
+
+    def file_exists(self, *path):
+        return os.path.exists(os.path.join(self.output_dir, *path))
+
+    def test_prerender(self):
+        self.prerender()
+
+        response = self.client.get(reverse('wagtailapi_v1_pages:detail', args=(16, )))
+        self.assertEqual(self.read_file('api', 'v1', 'pages', '16', 'index.json'), response.content)
+
+        response = self.client.get(reverse('wagtailapi_v1_pages:listing'))
+        self.assertEqual(self.read_file('api', 'v1', 'pages', 'index.json'), response.content)
+
+    def test_prerender_images(self):
+        self.prerender()
+
+        self.assertTrue(self.file_exists('api', 'v1', 'images', '5', 'index.json'))
+        self.assertTrue(self.file_exists('api', 'v1', 'documents', 'index.json'))
+
+    def test_private_pages_arent_prerendered(self):
+        Page.objects.get(id=5).view_restrictions.create(password='test')
+        self.prerender()
+
+        self.assertFalse(self.file_exists('api', 'v1', 'pages', '16', 'index.json'))
+
+    @override_settings(WAGTAILAPI_PRERENDER_LISTINGS=['/api/v1/pages/?type=tests.BlogEntryPage'])
+    def test_prerender_listings_setting(self):
+        self.prerender()
+
+        response = self.client.get(reverse('wagtailapi_v1_pages:listing'), {'type': 'tests.BlogEntryPage'})
+        self.assertEqual(self.read_file('api', 'v1', 'pages', 'index.type%3Dtests.BlogEntryPage.json'), response.content)
+        self.assertFalse(self.file_exists('api', 'v1', 'pages', 'index.json'))
+
+    def test_full_build_removes_unpublished_pages(self):
+        self.prerender()
+        Page.objects.get(id=16).unpublish()
+        self.prerender()
+
+        self.assertFalse(self.file_exists('api', 'v1', 'pages', '16', 'index.json'))
+
+    def test_incremental_without_broker(self):
+        self.prerender()
+
+        with self.assertRaises(CommandError):
+            self.prerender(incremental=True)
+
+    @override_settings(WAGTAILAPI_CHANGES_BROKER='wagtailapi.brokers.DatabaseBroker')
+    def test_incremental(self):
+        signal_handlers.register_change_feed_signal_handlers()
+        try:
+            self.prerender()
+
+            page = Page.objects.get(id=16).specific
+            page.title = "Changed title"
+            page.save_revision().publish()
+            Page.objects.get(id=18).unpublish()
+
+            self.prerender(incremental=True)
+        finally:
+            signal_handlers.unregister_change_feed_signal_handlers()
+
+        content = json.loads(self.read_file('api', 'v1', 'pages', '16', 'index.json').decode('UTF-8'))
+        self.assertEqual(content['title'], "Changed title")
+        self.assertFalse(self.file_exists('api', 'v1', 'pages', '18', 'index.json'))
+
+    @override_settings(WAGTAILAPI_CHANGES_BROKER='wagtailapi.brokers.DatabaseBroker', WAGTAILAPI_SYNC_RETENTION_DAYS=0)
+    def test_incremental_after_events_are_removed(self):
+        # The events since the previous build may have been removed
+        self.prerender()
+
+        with self.assertRaises(CommandError):
+            self.prerender(incremental=True)
+
+
+class TestBenchmarkAPIPagination(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    def benchmark(self, **options):
+        stdout = six.StringIO()
+        call_command('benchmark_api_pagination', stdout=stdout, repeat=1, **options)
+        return stdout.getvalue()
+
+    def get_rows(self, output):
+        # Method name, number of queries and total count of each method
+        return [
+            (line[:20].strip(), ) + tuple(int(value) for value in line[20:].split()[:2])
+            for line in output.splitlines()
+            if line.startswith(('separate count', 'windowed count'))
+        ]
+
+    def test_benchmark(self):
+        output = self.benchmark(limit=2)
+
+        self.assertEqual(self.get_rows(output), [
+            ('separate count', 2, Page.objects.live().public().count() - 1),
+            ('windowed count', 1, Page.objects.live().public().count() - 1),
+        ])
+
+    def test_benchmark_search(self):
+        output = self.benchmark(search='blog', limit=2)
+
+        self.assertEqual([row[2] for row in self.get_rows(output)], [4, 4])
+
+    def test_unknown_endpoint(self):
+        with self.assertRaises(CommandError):
+            self.benchmark(endpoint='foo')
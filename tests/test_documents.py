@@ -1,6 +1,7 @@
 import json
 import unittest
 import mock
+from collections import OrderedDict
 
 from django.test import TestCase
 from django.test.utils import override_settings
@@ -10,6 +11,7 @@ from django.conf import settings
 from wagtail.wagtaildocs.models import Document
 
 from wagtailapi import signal_handlers
+from wagtailapi.models import DocumentMetadata
 
 from . import models
 
@@ -120,6 +122,16 @@ class TestDocumentListing(TestCase):
         document_id_list = self.get_document_id_list(content)
         self.assertEqual(document_id_list, [3])
 
+    def test_filtering_any_tags(self):
+        Document.objects.get(id=2).tags.add('test')
+        Document.objects.get(id=3).tags.add('other')
+
+        response = self.get_response(tags='test|other')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        document_id_list = self.get_document_id_list(content)
+        self.assertEqual(document_id_list, [2, 3])
+
     def test_filtering_unknown_field_gives_error(self):
         response = self.get_response(not_a_field='abc')
         content = json.loads(response.content.decode('UTF-8'))
@@ -127,6 +139,56 @@ class TestDocumentListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "query parameter is not an operation or a recognised field: not_a_field"})
 
+    @override_settings(WAGTAILAPI_RENDITION_FILTERS=['fill-100x100'])
+    def test_rendition_gives_error(self):
+        response = self.get_response(rendition='fill-100x100')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "query parameter is not an operation or a recognised field: rendition"})
+
+
+    # FILE METADATA
+
+    def test_file_metadata_fields(self):
+        DocumentMetadata.objects.create(document_id=1, file_name='documents/test.pdf', file_size=1234, content_type='application/pdf', checksum='abc')
+
+        response = self.get_response(fields='title,file_size,content_type,checksum')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        documents = dict((document['id'], document) for document in content['documents'])
+        self.assertEqual(documents[1]['file_size'], 1234)
+        self.assertEqual(documents[1]['content_type'], 'application/pdf')
+        self.assertEqual(documents[1]['checksum'], 'abc')
+
+        # Documents without metadata
+        self.assertIsNone(documents[2]['file_size'])
+
+    def test_file_metadata_fields_are_in_requested_order(self):
+        DocumentMetadata.objects.create(document_id=1, file_name='documents/test.pdf', file_size=1234, content_type='application/pdf', checksum='abc')
+
+        response = self.get_response(fields='file_size,title,checksum')
+        content = json.loads(response.content.decode('UTF-8'), object_pairs_hook=OrderedDict)
+
+        self.assertEqual(list(content['documents'][0].keys()), ['id', 'file_size', 'title', 'checksum'])
+
+    def test_filter_by_content_type(self):
+        DocumentMetadata.objects.create(document_id=1, file_name='documents/test.pdf', file_size=1234, content_type='application/pdf', checksum='abc')
+
+        response = self.get_response(content_type='application/pdf')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual([document['id'] for document in content['documents']], [1])
+
+    def test_order_by_file_size(self):
+        DocumentMetadata.objects.create(document_id=1, file_name='documents/a.pdf', file_size=200, content_type='application/pdf', checksum='abc')
+        DocumentMetadata.objects.create(document_id=2, file_name='documents/b.pdf', file_size=100, content_type='application/pdf', checksum='def')
+
+        response = self.get_response(order='file_size', content_type='application/pdf')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual([document['id'] for document in content['documents']], [2, 1])
+
 
     # ORDERING
 
@@ -270,12 +332,12 @@ class TestDocumentListing(TestCase):
 
         self.assertEqual(set(document_id_list), set([2]))
 
-    def test_search_when_ordering_gives_error(self):
+    def test_search_when_ordering_by_unindexed_field_gives_error(self):
         response = self.get_response(search='james', order='title')
         content = json.loads(response.content.decode('UTF-8'))
 
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "ordering with a search query is not supported"})
+        self.assertEqual(content, {'message': "cannot order by 'title' with a search query (field isn't indexed)"})
 
     @override_settings(WAGTAILAPI_SEARCH_ENABLED=False)
     def test_search_when_disabled_gives_error(self):
@@ -285,12 +347,14 @@ class TestDocumentListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "search is disabled"})
 
-    def test_search_when_filtering_by_tag_gives_error(self):
-        response = self.get_response(search='james', tags='wagtail')
+    def test_search_when_filtering_by_tag(self):
+        Document.objects.get(id=2).tags.add('test')
+
+        response = self.get_response(search='james', tags='test')
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "filtering by tag with a search query is not supported"})
+        document_id_list = self.get_document_id_list(content)
+        self.assertEqual(document_id_list, [2])
 
 
 class TestDocumentDetail(TestCase):
@@ -344,6 +408,22 @@ class TestDocumentDetail(TestCase):
         self.assertIn('tags', content)
         self.assertEqual(content['tags'], ['hello', 'world'])
 
+    def test_file_metadata(self):
+        DocumentMetadata.objects.create(document_id=1, file_name='documents/test.pdf', file_size=1234, content_type='application/pdf', checksum='abc')
+
+        response = self.get_response(1)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['file_size'], 1234)
+        self.assertEqual(content['content_type'], 'application/pdf')
+        self.assertEqual(content['checksum'], 'abc')
+
+    def test_save_document_with_missing_file(self):
+        # The file doesn't exist so metadata can't be stored
+        Document.objects.get(id=1).save()
+
+        self.assertFalse(DocumentMetadata.objects.filter(document_id=1).exists())
+
     def test_download_url(self):
         response = self.get_response(1)
         content = json.loads(response.content.decode('UTF-8'))
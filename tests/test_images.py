@@ -1,4 +1,5 @@
 import json
+import datetime
 import unittest
 import mock
 
@@ -6,8 +7,9 @@ from django.test import TestCase
 from django.test.utils import override_settings
 from django.core.urlresolvers import reverse
 from django.conf import settings
+from django.utils import timezone
 
-from wagtail.wagtailimages.models import get_image_model
+from wagtail.wagtailimages.models import get_image_model, Filter
 
 from wagtailapi import signal_handlers
 
@@ -23,6 +25,9 @@ class TestImageListing(TestCase):
     def get_image_id_list(self, content):
         return [page['id'] for page in content['images']]
 
+    def get_yesterday(self):
+        return (timezone.now() - datetime.timedelta(days=1)).isoformat()
+
 
     # BASIC TESTS
 
@@ -121,6 +126,16 @@ class TestImageListing(TestCase):
         image_id_list = self.get_image_id_list(content)
         self.assertEqual(image_id_list, [6])
 
+    def test_filtering_any_tags(self):
+        get_image_model().objects.get(id=5).tags.add('test')
+        get_image_model().objects.get(id=6).tags.add('other')
+
+        response = self.get_response(tags='test|other')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        image_id_list = self.get_image_id_list(content)
+        self.assertEqual(image_id_list, [5, 6])
+
     def test_filtering_unknown_field_gives_error(self):
         response = self.get_response(not_a_field='abc')
         content = json.loads(response.content.decode('UTF-8'))
@@ -129,6 +144,115 @@ class TestImageListing(TestCase):
         self.assertEqual(content, {'message': "query parameter is not an operation or a recognised field: not_a_field"})
 
 
+    # RENDITIONS
+
+    def create_rendition(self, image_id, filter_spec):
+        image = get_image_model().objects.get(id=image_id)
+        image_filter, created = Filter.objects.get_or_create(spec=filter_spec)
+
+        return image.renditions.create(
+            filter=image_filter,
+            file='images/test.%s.jpg' % filter_spec,
+            width=100,
+            height=100,
+            focal_point_key=image_filter.get_vary_key(image),
+        )
+
+    @override_settings(WAGTAILAPI_RENDITION_FILTERS=['fill-100x100'], WAGTAILAPI_RENDITION_GENERATE_MAX=0)
+    def test_rendition(self):
+        self.create_rendition(5, 'fill-100x100')
+
+        response = self.get_response(rendition='fill-100x100')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        renditions = dict((image['id'], image['rendition']) for image in content['images'])
+        self.assertTrue(renditions[5]['url'].endswith('/images/test.fill-100x100.jpg'))
+        self.assertEqual(renditions[5]['width'], 100)
+        self.assertEqual(renditions[5]['height'], 100)
+
+    @override_settings(WAGTAILAPI_RENDITION_FILTERS=['fill-100x100'], WAGTAILAPI_RENDITION_GENERATE_MAX=0)
+    def test_missing_rendition_gives_rendition_view_url(self):
+        response = self.get_response(rendition='fill-100x100')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        for image in content['images']:
+            self.assertEqual(image['rendition'], {
+                'url': 'http://localhost' + reverse('wagtailapi_v1_images:rendition', args=(image['id'], 'fill-100x100')),
+            })
+
+    def test_invalid_rendition_gives_error(self):
+        response = self.get_response(rendition='fill-100')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "rendition must be an image filter spec (eg, fill-200x200)"})
+
+    @override_settings(WAGTAILAPI_RENDITION_FILTERS=['fill-200x200'])
+    def test_rendition_not_allowed_gives_error(self):
+        response = self.get_response(rendition='fill-100x100')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "rendition 'fill-100x100' is not allowed"})
+
+    def test_rendition_not_allowed_by_default(self):
+        response = self.get_response(rendition='fill-100x100')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "rendition 'fill-100x100' is not allowed"})
+
+    def test_rendition_view_not_allowed_gives_error(self):
+        response = self.client.get(reverse('wagtailapi_v1_images:rendition', args=(5, 'fill-100x100')))
+
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(WAGTAILAPI_RENDITION_FILTERS=['fill-100x100'])
+    def test_rendition_view_missing_file_gives_404(self):
+        # The image files in the fixture don't exist
+        response = self.client.get(reverse('wagtailapi_v1_images:rendition', args=(5, 'fill-100x100')))
+
+        self.assertEqual(response.status_code, 404)
+
+
+    # CHANGED SINCE
+
+    def test_changed_since(self):
+        get_image_model().objects.filter(id__in=[12, 13]).update(created_at=timezone.now())
+
+        response = self.get_response(changed_since=self.get_yesterday())
+        content = json.loads(response.content.decode('UTF-8'))
+
+        image_id_list = self.get_image_id_list(content)
+        self.assertEqual(image_id_list, [12, 13])
+
+    def test_changed_since_edited(self):
+        image = get_image_model().objects.get(id=5)
+        image.title = "Changed title"
+        image.save()
+
+        response = self.get_response(changed_since=self.get_yesterday())
+        content = json.loads(response.content.decode('UTF-8'))
+
+        image_id_list = self.get_image_id_list(content)
+        self.assertEqual(image_id_list, [5])
+
+    def test_changed_since_deleted(self):
+        get_image_model().objects.get(id=5).delete()
+
+        response = self.get_response(changed_since=self.get_yesterday())
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['deleted'], [5])
+
+    def test_changed_since_invalid_gives_error(self):
+        response = self.get_response(changed_since='yesterday')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "changed_since must be a valid date/time"})
+
+
     # ORDERING
 
     def test_ordering_default(self):
@@ -177,6 +301,59 @@ class TestImageListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "random ordering with offset is not supported"})
 
+    def test_ordering_by_random_with_seed(self):
+        response_1 = self.get_response(order='random', seed=1234)
+        content_1 = json.loads(response_1.content.decode('UTF-8'))
+        image_id_list_1 = self.get_image_id_list(content_1)
+
+        response_2 = self.get_response(order='random', seed=1234)
+        content_2 = json.loads(response_2.content.decode('UTF-8'))
+        image_id_list_2 = self.get_image_id_list(content_2)
+
+        self.assertEqual(image_id_list_1, image_id_list_2)
+
+    def test_ordering_by_random_with_seed_and_offset(self):
+        response = self.get_response(order='random', seed=1234, limit=6)
+        content = json.loads(response.content.decode('UTF-8'))
+        image_id_list = self.get_image_id_list(content)
+
+        response_1 = self.get_response(order='random', seed=1234, limit=3)
+        content_1 = json.loads(response_1.content.decode('UTF-8'))
+        response_2 = self.get_response(order='random', seed=1234, limit=3, offset=3)
+        content_2 = json.loads(response_2.content.decode('UTF-8'))
+
+        # The pages must line up with each other
+        self.assertEqual(self.get_image_id_list(content_1) + self.get_image_id_list(content_2), image_id_list)
+        self.assertEqual(content_2['meta']['total_count'], content['meta']['total_count'])
+
+    @mock.patch('wagtailapi.utils.RANDOM_SAMPLE_SHUFFLE_MAX', 0)
+    def test_ordering_by_random_with_seed_and_offset_sampled(self):
+        response = self.get_response(order='random', seed=1234, limit=6)
+        content = json.loads(response.content.decode('UTF-8'))
+        image_id_list = self.get_image_id_list(content)
+        self.assertEqual(len(set(image_id_list)), 6)
+
+        response_1 = self.get_response(order='random', seed=1234, limit=3)
+        content_1 = json.loads(response_1.content.decode('UTF-8'))
+        response_2 = self.get_response(order='random', seed=1234, limit=3, offset=3)
+        content_2 = json.loads(response_2.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_image_id_list(content_1) + self.get_image_id_list(content_2), image_id_list)
+
+    def test_ordering_by_random_with_invalid_seed_gives_error(self):
+        response = self.get_response(order='random', seed='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "seed must be a positive integer"})
+
+    def test_seed_without_random_ordering_gives_error(self):
+        response = self.get_response(order='title', seed=1234)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "seed can only be used with random ordering"})
+
     def test_ordering_by_unknown_field_gives_error(self):
         response = self.get_response(order='not_a_field')
         content = json.loads(response.content.decode('UTF-8'))
@@ -271,12 +448,12 @@ class TestImageListing(TestCase):
 
         self.assertEqual(set(image_id_list), set([5]))
 
-    def test_search_when_ordering_gives_error(self):
+    def test_search_when_ordering_by_unindexed_field_gives_error(self):
         response = self.get_response(search='james', order='title')
         content = json.loads(response.content.decode('UTF-8'))
 
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "ordering with a search query is not supported"})
+        self.assertEqual(content, {'message': "cannot order by 'title' with a search query (field isn't indexed)"})
 
     @override_settings(WAGTAILAPI_SEARCH_ENABLED=False)
     def test_search_when_disabled_gives_error(self):
@@ -286,12 +463,14 @@ class TestImageListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "search is disabled"})
 
-    def test_search_when_filtering_by_tag_gives_error(self):
-        response = self.get_response(search='james', tags='wagtail')
+    def test_search_when_filtering_by_tag(self):
+        get_image_model().objects.get(id=5).tags.add('test')
+
+        response = self.get_response(search='james', tags='test')
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "filtering by tag with a search query is not supported"})
+        image_id_list = self.get_image_id_list(content)
+        self.assertEqual(image_id_list, [5])
 
 
 class TestImageDetail(TestCase):
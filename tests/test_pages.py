@@ -1,15 +1,24 @@
 import json
+import gzip
+import datetime
 import unittest
 import mock
+import six
 
 from django.test import TestCase
-from django.test.utils import override_settings
+from django.test.utils import override_settings, CaptureQueriesContext
+from django.db import connection
 from django.core.urlresolvers import reverse
 from django.conf import settings
+from django.utils import timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
 
-from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.models import Page, PageRevision
 
-from wagtailapi import signal_handlers
+from wagtailapi import signal_handlers, renderers
+from wagtailapi.models import PageSnapshot, Tombstone, Modification
+from wagtailapi.api import PagesAPIEndpoint
 
 from . import models
 
@@ -28,6 +37,15 @@ class TestPageListing(TestCase):
     def get_page_id_list(self, content):
         return [page['id'] for page in content['pages']]
 
+    def get_yesterday(self):
+        return (timezone.now() - datetime.timedelta(days=1)).isoformat()
+
+    def get_listing_sql(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_response(**params)
+
+        return ' '.join(query['sql'] for query in queries.captured_queries)
+
 
     # BASIC TESTS
 
@@ -115,6 +133,58 @@ class TestPageListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "type doesn't exist"})
 
+    def test_multiple_type_filter(self):
+        response = self.get_response(type='tests.BlogEntryPage,tests.EventPage')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        types = set(page['meta']['type'] for page in content['pages'])
+        self.assertEqual(types, {'tests.BlogEntryPage', 'tests.EventPage'})
+        self.assertEqual(content['meta']['total_count'], 5)
+
+    def test_multiple_type_filter_with_specific_field_gives_error(self):
+        response = self.get_response(type='tests.BlogEntryPage,tests.EventPage', fields='title,date')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "unknown fields: date"})
+
+    def test_multiple_type_filter_with_non_existant_type_gives_error(self):
+        response = self.get_response(type='tests.BlogEntryPage,tests.IDontExist')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "type doesn't exist"})
+
+    def test_non_page_type_gives_error(self):
+        response = self.get_response(type='wagtailimages.Image')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "type doesn't exist"})
+
+    def test_type_meta_matches_specific_class(self):
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+
+        for page in content['pages']:
+            specific_class = Page.objects.get(id=page['id']).specific_class
+            self.assertEqual(page['meta']['type'], specific_class._meta.app_label + '.' + specific_class.__name__)
+
+    def test_type_filter_doesnt_join_specific_table(self):
+        sql = self.get_listing_sql(type='tests.BlogEntryPage', order='-title')
+
+        self.assertNotIn('tests_blogentrypage', sql)
+
+    def test_type_filter_with_specific_field_joins_specific_table(self):
+        sql = self.get_listing_sql(type='tests.BlogEntryPage', fields='title,date')
+
+        self.assertIn('tests_blogentrypage', sql)
+
+    def test_type_filter_with_specific_ordering_joins_specific_table(self):
+        sql = self.get_listing_sql(type='tests.BlogEntryPage', order='date')
+
+        self.assertIn('tests_blogentrypage', sql)
+
 
     # EXTRA FIELDS
 
@@ -169,6 +239,21 @@ class TestPageListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "unknown fields: 123, abc"})
 
+    def test_extra_fields_page_fields_without_type(self):
+        response = self.get_response(fields='title,slug,url_path,depth,latest_revision_created_at')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page = [page for page in content['pages'] if page['id'] == 16][0]
+        self.assertEqual(page['slug'], 'blog-post')
+        self.assertEqual(page['url_path'], '/home-page/blog-index/blog-post/')
+        self.assertEqual(page['depth'], 4)
+        self.assertEqual(page['latest_revision_created_at'], None)
+
+    def test_extra_fields_page_fields_with_type_doesnt_join_specific_table(self):
+        sql = self.get_listing_sql(type='tests.BlogEntryPage', fields='title,slug,url_path')
+
+        self.assertNotIn('tests_blogentrypage', sql)
+
 
     # FILTERING
 
@@ -179,6 +264,13 @@ class TestPageListing(TestCase):
         page_id_list = self.get_page_id_list(content)
         self.assertEqual(page_id_list, [2])
 
+    def test_filtering_on_slug(self):
+        response = self.get_response(slug='blog-post')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [16])
+
     def test_filtering_exact_filter_on_specific_field(self):
         response = self.get_response(type='tests.BlogEntryPage', date='2013-12-02')
         content = json.loads(response.content.decode('UTF-8'))
@@ -207,6 +299,20 @@ class TestPageListing(TestCase):
         page_id_list = self.get_page_id_list(content)
         self.assertEqual(page_id_list, [16])
 
+    def test_filtering_any_tags(self):
+        response = self.get_response(type='tests.BlogEntryPage', tags='wagtail|bird')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [16, 18, 19])
+
+    def test_filtering_unknown_tag(self):
+        response = self.get_response(type='tests.BlogEntryPage', tags='wagtail,not_a_tag')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [])
+
     def test_filtering_unknown_field_gives_error(self):
         response = self.get_response(not_a_field='abc')
         content = json.loads(response.content.decode('UTF-8'))
@@ -291,6 +397,34 @@ class TestPageListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "ancestor page doesn't exist"})
 
+    def test_descendant_of_with_depth(self):
+        response = self.get_response(descendant_of=6, depth=1)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [10, 15, 17, 21])
+
+    def test_descendant_of_with_depth_2(self):
+        response = self.get_response(descendant_of=2, depth=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [4, 8, 9, 5, 16, 18, 19, 6, 10, 15, 17, 21, 20, 13, 14, 12])
+
+    def test_descendant_of_with_invalid_depth_gives_error(self):
+        response = self.get_response(descendant_of=6, depth=0)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "depth must be a positive integer"})
+
+    def test_depth_without_descendant_of_gives_error(self):
+        response = self.get_response(depth=1)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "depth can only be used with descendant_of"})
+
     def test_descendant_of_when_filtering_by_child_of_gives_error(self):
         response = self.get_response(descendant_of=6, child_of=5)
         content = json.loads(response.content.decode('UTF-8'))
@@ -299,276 +433,921 @@ class TestPageListing(TestCase):
         self.assertEqual(content, {'message': "filtering by descendant_of with child_of is not supported"})
 
 
-    # ORDERING
+    # HTML URL
 
-    def test_ordering_default(self):
+    def test_html_url(self):
         response = self.get_response()
         content = json.loads(response.content.decode('UTF-8'))
 
-        page_id_list = self.get_page_id_list(content)
-        self.assertEqual(page_id_list, [2, 4, 8, 9, 5, 16, 18, 19, 6, 10, 15, 17, 21, 22, 23, 20, 13, 14, 12])
+        html_urls = dict((page['id'], page['meta']['html_url']) for page in content['pages'])
+        self.assertEqual(html_urls[2], 'http://localhost/')
+        self.assertEqual(html_urls[16], 'http://localhost/blog-index/blog-post/')
 
-    def test_ordering_by_title(self):
-        response = self.get_response(order='title')
+    def test_html_url_doesnt_query_per_page(self):
+        # Warm up any caches (such as content types and site root paths)
+        self.get_response(limit=10)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_response(limit=1)
+
+        with CaptureQueriesContext(connection) as more_queries:
+            self.get_response(limit=10)
+
+        self.assertEqual(len(more_queries), len(queries))
+
+
+    # CHILDREN COUNT
+
+    def test_children_count(self):
+        response = self.get_response(children_count='true')
         content = json.loads(response.content.decode('UTF-8'))
 
-        page_id_list = self.get_page_id_list(content)
-        self.assertEqual(page_id_list, [21, 22, 19, 23, 5, 16, 18, 12, 14, 8, 9, 4, 2, 13, 20, 17, 6, 10, 15])
+        children_counts = dict((page['id'], page['meta']['children_count']) for page in content['pages'])
+        self.assertEqual(children_counts[2], 5)
+        self.assertEqual(children_counts[5], 3)
+        self.assertEqual(children_counts[21], 2)
+        self.assertEqual(children_counts[16], 0)
 
-    def test_ordering_by_title_backwards(self):
-        response = self.get_response(order='-title')
+    def test_has_children(self):
+        response = self.get_response(children_count='true')
         content = json.loads(response.content.decode('UTF-8'))
 
-        page_id_list = self.get_page_id_list(content)
-        self.assertEqual(page_id_list, [15, 10, 6, 17, 20, 13, 2, 4, 9, 8, 14, 12, 18, 16, 5, 23, 19, 22, 21])
+        has_children = dict((page['id'], page['meta']['has_children']) for page in content['pages'])
+        self.assertTrue(has_children[5])
+        self.assertFalse(has_children[16])
 
-    def test_ordering_by_random(self):
-        response_1 = self.get_response(order='random')
-        content_1 = json.loads(response_1.content.decode('UTF-8'))
-        page_id_list_1 = self.get_page_id_list(content_1)
+    def test_children_count_not_shown_by_default(self):
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
 
-        response_2 = self.get_response(order='random')
-        content_2 = json.loads(response_2.content.decode('UTF-8'))
-        page_id_list_2 = self.get_page_id_list(content_2)
+        for page in content['pages']:
+            self.assertNotIn('children_count', page['meta'])
+            self.assertNotIn('has_children', page['meta'])
 
-        self.assertNotEqual(page_id_list_1, page_id_list_2)
+    def test_children_count_skips_private_pages(self):
+        Page.objects.get(id=16).view_restrictions.create(password='test')
 
-    def test_ordering_by_random_backwards_gives_error(self):
-        response = self.get_response(order='-random')
+        response = self.get_response(children_count='true')
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "cannot order by 'random' (unknown field)"})
+        children_counts = dict((page['id'], page['meta']['children_count']) for page in content['pages'])
+        self.assertEqual(children_counts[5], 2)
 
-    def test_ordering_by_random_with_offset_gives_error(self):
-        response = self.get_response(order='random', offset=10)
+    def test_children_count_uses_one_query(self):
+        self.get_response(limit=10)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_response(limit=10)
+
+        with CaptureQueriesContext(connection) as more_queries:
+            self.get_response(limit=10, children_count='true')
+
+        self.assertEqual(len(more_queries), len(queries) + 1)
+
+    def test_children_count_invalid_value_gives_error(self):
+        response = self.get_response(children_count='yes')
         content = json.loads(response.content.decode('UTF-8'))
 
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "random ordering with offset is not supported"})
+        self.assertEqual(content, {'message': "children_count must be 'true' or 'false'"})
 
-    def test_ordering_default_with_type(self):
-        response = self.get_response(type='tests.BlogEntryPage')
-        content = json.loads(response.content.decode('UTF-8'))
 
-        page_id_list = self.get_page_id_list(content)
-        self.assertEqual(page_id_list, [16, 18, 19])
+    # EXPAND
 
-    def test_ordering_by_title_with_type(self):
-        response = self.get_response(type='tests.BlogEntryPage', order='title')
+    def test_expand(self):
+        response = self.get_response(type='tests.BlogEntryPage', fields='title,feed_image', expand='feed_image')
         content = json.loads(response.content.decode('UTF-8'))
 
-        page_id_list = self.get_page_id_list(content)
-        self.assertEqual(page_id_list, [19, 16, 18])
+        feed_images = dict((page['id'], page['feed_image']) for page in content['pages'])
+        self.assertEqual(feed_images[16], {'id': 7, 'title': "Wagtail by Joe Buckingham"})
+        self.assertEqual(feed_images[18]['id'], 15)
+        self.assertEqual(feed_images[19]['id'], 14)
 
-    def test_ordering_by_specific_field_with_type(self):
-        response = self.get_response(type='tests.BlogEntryPage', order='date')
+    @override_settings(WAGTAILAPI_RENDITION_FILTERS=['fill-100x100'], WAGTAILAPI_RENDITION_GENERATE_MAX=0)
+    def test_expand_with_rendition(self):
+        response = self.get_response(type='tests.BlogEntryPage', expand='feed_image', rendition='fill-100x100')
         content = json.loads(response.content.decode('UTF-8'))
 
-        page_id_list = self.get_page_id_list(content)
-        self.assertEqual(page_id_list, [16, 18, 19])
+        for page in content['pages']:
+            self.assertIn('url', page['feed_image']['rendition'])
 
-    def test_ordering_by_unknown_field_gives_error(self):
-        response = self.get_response(order='not_a_field')
+    @override_settings(WAGTAILAPI_RENDITION_FILTERS=['fill-100x100'])
+    def test_rendition_without_expanding_images_gives_error(self):
+        response = self.get_response(type='tests.BlogEntryPage', rendition='fill-100x100')
         content = json.loads(response.content.decode('UTF-8'))
 
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "cannot order by 'not_a_field' (unknown field)"})
+        self.assertEqual(content, {'message': "query parameter is not an operation or a recognised field: rendition"})
 
+    def test_expand_adds_field(self):
+        response = self.get_response(type='tests.BlogEntryPage', expand='feed_image')
+        content = json.loads(response.content.decode('UTF-8'))
 
-    # LIMIT
+        for page in content['pages']:
+            self.assertIn('feed_image', page)
 
-    def test_limit_only_two_results_returned(self):
-        response = self.get_response(limit=2)
-        content = json.loads(response.content.decode('UTF-8'))
+    def test_expand_uses_one_query(self):
+        # Warm up any caches (such as content types)
+        self.get_response(type='tests.BlogEntryPage', fields='title,feed_image')
 
-        self.assertEqual(len(content['pages']), 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.get_response(type='tests.BlogEntryPage', fields='title,feed_image')
 
-    def test_limit_total_count(self):
-        response = self.get_response(limit=2)
-        content = json.loads(response.content.decode('UTF-8'))
+        with CaptureQueriesContext(connection) as expand_queries:
+            self.get_response(type='tests.BlogEntryPage', fields='title,feed_image', expand='feed_image')
 
-        # The total count must not be affected by "limit"
-        self.assertEqual(content['meta']['total_count'], get_total_page_count())
+        self.assertEqual(len(expand_queries), len(queries) + 1)
 
-    def test_limit_not_integer_gives_error(self):
-        response = self.get_response(limit='abc')
+    def test_expand_deleted_object(self):
+        models.BlogEntryPage.objects.filter(id=16).update(feed_image=None)
+
+        response = self.get_response(type='tests.BlogEntryPage', expand='feed_image')
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "limit must be a positive integer"})
+        feed_images = dict((page['id'], page['feed_image']) for page in content['pages'])
+        self.assertIsNone(feed_images[16])
 
-    def test_limit_too_high_gives_error(self):
-        response = self.get_response(limit=1000)
+    def test_expand_non_relation_gives_error(self):
+        response = self.get_response(type='tests.BlogEntryPage', expand='date')
         content = json.loads(response.content.decode('UTF-8'))
 
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "limit cannot be higher than 20"})
+        self.assertEqual(content, {'message': "cannot expand 'date' (not a relation to a page, image or document)"})
 
-    @override_settings(WAGTAILAPI_LIMIT_MAX=10)
-    def test_limit_maximum_can_be_changed(self):
-        response = self.get_response(limit=20)
+    def test_expand_without_type_gives_error(self):
+        response = self.get_response(expand='feed_image')
         content = json.loads(response.content.decode('UTF-8'))
 
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "limit cannot be higher than 10"})
+        self.assertEqual(content, {'message': "cannot expand 'feed_image' (not a relation to a page, image or document)"})
 
-    @override_settings(WAGTAILAPI_LIMIT_MAX=2)
-    def test_limit_default_changes_with_max(self):
-        # The default limit is 20. If WAGTAILAPI_LIMIT_MAX is less than that,
-        # the default should change accordingly.
-        response = self.get_response()
-        content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertEqual(len(content['pages']), 2)
+    # INCLUDE
+
+    def test_include(self):
+        response = self.get_response(type='tests.BlogEntryPage', fields='title,feed_image', include='feed_image')
+        content = json.loads(response.content.decode('UTF-8'))
 
+        # The field is left as a reference
+        feed_images = dict((page['id'], page['feed_image']) for page in content['pages'])
+        self.assertEqual(feed_images, {16: 7, 18: 15, 19: 14})
 
-    # OFFSET
+        self.assertEqual(list(content['included'].keys()), ['images'])
+        self.assertEqual(set(content['included']['images'].keys()), set(['7', '14', '15']))
+        self.assertEqual(content['included']['images']['7'], {'id': 7, 'title': "Wagtail by Joe Buckingham"})
 
-    def test_offset_5_usually_appears_5th_in_list(self):
-        response = self.get_response()
+    def test_include_child_relation(self):
+        response = self.get_response(type='tests.BlogEntryPage', include='feed_image,carousel_items.image')
         content = json.loads(response.content.decode('UTF-8'))
-        page_id_list = self.get_page_id_list(content)
-        self.assertEqual(page_id_list.index(5), 4)
 
-    def test_offset_5_moves_after_offset(self):
-        response = self.get_response(offset=4)
+        # Image 7 is both a feed image and a carousel image but is only included once
+        self.assertEqual(sorted(content['included']['images'].keys()), ['14', '15', '7', '9'])
+
+    def test_include_adds_field(self):
+        response = self.get_response(type='tests.BlogEntryPage', include='carousel_items.image')
         content = json.loads(response.content.decode('UTF-8'))
-        page_id_list = self.get_page_id_list(content)
-        self.assertEqual(page_id_list.index(5), 0)
 
-    def test_offset_total_count(self):
-        response = self.get_response(offset=10)
+        for page in content['pages']:
+            self.assertIn('carousel_items', page)
+
+    def test_include_empty_listing(self):
+        response = self.get_response(type='tests.BlogEntryPage', include='feed_image', title='foo')
         content = json.loads(response.content.decode('UTF-8'))
 
-        # The total count must not be affected by "offset"
-        self.assertEqual(content['meta']['total_count'], get_total_page_count())
+        self.assertEqual(content['included'], {})
 
-    def test_offset_not_integer_gives_error(self):
-        response = self.get_response(offset='abc')
+    def test_include_non_relation_gives_error(self):
+        response = self.get_response(type='tests.BlogEntryPage', include='carousel_items.caption')
         content = json.loads(response.content.decode('UTF-8'))
 
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "offset must be a positive integer"})
+        self.assertEqual(content, {'message': "cannot include 'carousel_items.caption' (not a relation to a page, image or document)"})
 
 
-    # SEARCH
+    # CHANGED SINCE
 
-    def test_search_for_blog(self):
-        response = self.get_response(search='blog')
+    def test_changed_since(self):
+        Page.objects.get(id=16).save_revision().publish()
+        Page.objects.get(id=18).save_revision().publish()
+
+        response = self.get_response(changed_since=(timezone.now() - datetime.timedelta(hours=1)).isoformat())
         content = json.loads(response.content.decode('UTF-8'))
 
         page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [16, 18])
 
-        # Check that the results are the blog index and three blog pages
-        self.assertEqual(set(page_id_list), set([5, 16, 18, 19]))
+    def test_changed_since_date(self):
+        now = timezone.now()
+        Page.objects.get(id=16).save_revision().publish()
+        Modification.objects.update(modified_at=now - datetime.timedelta(days=2))
 
-    def test_search_with_type(self):
-        response = self.get_response(type='tests.BlogEntryPage', search='blog')
+        response = self.get_response(changed_since=(now - datetime.timedelta(days=1)).date().isoformat())
         content = json.loads(response.content.decode('UTF-8'))
 
         page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [])
 
-        self.assertEqual(set(page_id_list), set([16, 18, 19]))
+    def test_changed_since_draft_isnt_changed(self):
+        # Drafts aren't visible in the API until they are published
+        Page.objects.get(id=16).save_revision()
 
-    def test_search_when_ordering_gives_error(self):
-        response = self.get_response(search='blog', order='title')
+        response = self.get_response(changed_since=self.get_yesterday())
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "ordering with a search query is not supported"})
+        self.assertEqual(self.get_page_id_list(content), [])
 
-    @override_settings(WAGTAILAPI_SEARCH_ENABLED=False)
-    def test_search_when_disabled_gives_error(self):
-        response = self.get_response(search='blog')
-        content = json.loads(response.content.decode('UTF-8'))
+    def test_changed_since_scheduled_publish(self):
+        # The revision is created long before it is published
+        revision = Page.objects.get(id=16).save_revision()
+        PageRevision.objects.filter(id=revision.id).update(
+            created_at=timezone.now() - datetime.timedelta(days=3),
+            approved_go_live_at=timezone.now() - datetime.timedelta(minutes=1),
+        )
+        Page.objects.filter(id=16).update(latest_revision_created_at=timezone.now() - datetime.timedelta(days=3))
 
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "search is disabled"})
+        call_command('publish_scheduled_pages')
 
-    def test_search_when_filtering_by_tag_gives_error(self):
-        response = self.get_response(type='tests.BlogEntryPage', search='blog', tags='wagtail')
+        response = self.get_response(changed_since=self.get_yesterday())
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(content, {'message': "filtering by tag with a search query is not supported"})
-
-
-class TestPageDetail(TestCase):
-    fixtures = ['wagtailapi_tests.json']
-
-    def get_response(self, page_id, **params):
-        return self.client.get(reverse('wagtailapi_v1_pages:detail', args=(page_id, )), params)
+        self.assertEqual(self.get_page_id_list(content), [16])
 
-    def test_status_code(self):
-        response = self.get_response(16)
-        self.assertEqual(response.status_code, 200)
+    def test_changed_since_moved_page(self):
+        # Move "Standard index page" (which has two children) under the homepage
+        Page.objects.get(id=21).move(Page.objects.get(id=2), pos='last-child')
 
-    def test_content_type_header(self):
-        response = self.get_response(16)
-        self.assertEqual(response['Content-type'], 'application/json')
+        response = self.get_response(changed_since=self.get_yesterday())
+        content = json.loads(response.content.decode('UTF-8'))
 
-    def test_valid_json(self):
-        response = self.get_response(16)
+        # The url_path of the children has changed too
+        self.assertEqual(self.get_page_id_list(content), [21, 22, 23])
 
-        # Will crash if there's a problem
-        json.loads(response.content.decode('UTF-8'))
+    def test_changed_since_deleted(self):
+        models.BlogEntryPage.objects.get(id=16).unpublish()
 
-    def test_meta(self):
-        response = self.get_response(16)
+        response = self.get_response(changed_since=self.get_yesterday())
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertIn('meta', content)
-        self.assertIsInstance(content['meta'], dict)
+        self.assertEqual(content['meta']['deleted'], [16])
 
-    def test_meta_type(self):
-        response = self.get_response(16)
+    def test_changed_since_republished_page_isnt_deleted(self):
+        page = models.BlogEntryPage.objects.get(id=16)
+        page.unpublish()
+        page.save_revision().publish()
+
+        response = self.get_response(changed_since=self.get_yesterday())
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertIn('type', content['meta'])
-        self.assertEquals(content['meta']['type'], 'tests.BlogEntryPage')
+        self.assertEqual(content['meta']['deleted'], [])
+        self.assertIn(16, self.get_page_id_list(content))
 
-    def test_meta_parent_id(self):
-        response = self.get_response(16)
+    def test_deleted_not_in_meta_without_changed_since(self):
+        response = self.get_response()
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertIn('parent', content['meta'])
-        self.assertEquals(content['meta']['parent'], 5)
+        self.assertNotIn('deleted', content['meta'])
 
-    def test_meta_parent_id_doesnt_show_root_page(self):
-        # Root page isn't in the site so don't show it if the user is looking at the home page
-        response = self.get_response(2)
+    def test_changed_since_invalid_gives_error(self):
+        response = self.get_response(changed_since='yesterday')
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertNotIn('parent', content['meta'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "changed_since must be a valid date/time"})
 
-    def test_custom_fields(self):
-        response = self.get_response(16)
+    def test_changed_since_before_retention_gives_error(self):
+        response = self.get_response(changed_since='2000-01-01')
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertIn('date', content)
-        self.assertEquals(content['date'], '2013-12-02')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "changed_since cannot be more than 30 days ago (fetch the full listing instead)"})
 
-        self.assertIn('body', content)
+    @override_settings(WAGTAILAPI_DELETED_MAX=1)
+    def test_changed_since_too_many_deleted_gives_error(self):
+        models.BlogEntryPage.objects.get(id=16).unpublish()
+        models.BlogEntryPage.objects.get(id=18).unpublish()
 
-    def test_tags(self):
-        response = self.get_response(16)
+        response = self.get_response(changed_since=self.get_yesterday())
         content = json.loads(response.content.decode('UTF-8'))
 
-        self.assertIn('tags', content)
-        self.assertEqual(content['tags'], ['wagtail', 'bird'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "too many objects have been removed since changed_since (fetch the full listing instead)"})
 
-    def test_child_relations(self):
-        response = self.get_response(16)
-        content = json.loads(response.content.decode('UTF-8'))
+    def test_old_tombstones_are_pruned(self):
+        models.BlogEntryPage.objects.get(id=16).unpublish()
+        Tombstone.objects.update(deleted_at=timezone.now() - datetime.timedelta(days=31))
 
-        self.assertIn('related_links', content)
-        self.assertEquals(content['related_links'], [])
+        models.BlogEntryPage.objects.get(id=18).unpublish()
 
-        self.assertIn('carousel_items', content)
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [18])
 
-        for carousel_item in content['carousel_items']:
-            self.assertEquals(carousel_item.keys(), {'embed_url', 'link', 'caption', 'image'})
+
+    # ORDERING
+
+    def test_ordering_default(self):
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [2, 4, 8, 9, 5, 16, 18, 19, 6, 10, 15, 17, 21, 22, 23, 20, 13, 14, 12])
+
+    def test_ordering_by_title(self):
+        response = self.get_response(order='title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [21, 22, 19, 23, 5, 16, 18, 12, 14, 8, 9, 4, 2, 13, 20, 17, 6, 10, 15])
+
+    def test_ordering_by_title_backwards(self):
+        response = self.get_response(order='-title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [15, 10, 6, 17, 20, 13, 2, 4, 9, 8, 14, 12, 18, 16, 5, 23, 19, 22, 21])
+
+    def test_ordering_by_slug(self):
+        response = self.get_response(order='slug')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [21, 22, 19, 23, 5, 16, 18, 12, 14, 8, 9, 4, 2, 13, 20, 17, 6, 10, 15])
+
+    def test_ordering_by_random(self):
+        response_1 = self.get_response(order='random')
+        content_1 = json.loads(response_1.content.decode('UTF-8'))
+        page_id_list_1 = self.get_page_id_list(content_1)
+
+        response_2 = self.get_response(order='random')
+        content_2 = json.loads(response_2.content.decode('UTF-8'))
+        page_id_list_2 = self.get_page_id_list(content_2)
+
+        self.assertNotEqual(page_id_list_1, page_id_list_2)
+
+    def test_ordering_by_random_backwards_gives_error(self):
+        response = self.get_response(order='-random')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cannot order by 'random' (unknown field)"})
+
+    def test_ordering_by_random_with_offset_gives_error(self):
+        response = self.get_response(order='random', offset=10)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "random ordering with offset is not supported"})
+
+    def test_ordering_by_random_with_seed(self):
+        response_1 = self.get_response(order='random', seed=1234)
+        content_1 = json.loads(response_1.content.decode('UTF-8'))
+        page_id_list_1 = self.get_page_id_list(content_1)
+
+        response_2 = self.get_response(order='random', seed=1234)
+        content_2 = json.loads(response_2.content.decode('UTF-8'))
+        page_id_list_2 = self.get_page_id_list(content_2)
+
+        self.assertEqual(page_id_list_1, page_id_list_2)
+
+    def test_ordering_by_random_with_seed_and_offset(self):
+        response = self.get_response(order='random', seed=1234, limit=6)
+        content = json.loads(response.content.decode('UTF-8'))
+        page_id_list = self.get_page_id_list(content)
+
+        response_1 = self.get_response(order='random', seed=1234, limit=3)
+        content_1 = json.loads(response_1.content.decode('UTF-8'))
+        response_2 = self.get_response(order='random', seed=1234, limit=3, offset=3)
+        content_2 = json.loads(response_2.content.decode('UTF-8'))
+
+        # The pages must line up with each other
+        self.assertEqual(self.get_page_id_list(content_1) + self.get_page_id_list(content_2), page_id_list)
+        self.assertEqual(content_2['meta']['total_count'], content['meta']['total_count'])
+
+    @mock.patch('wagtailapi.utils.RANDOM_SAMPLE_SHUFFLE_MAX', 0)
+    def test_ordering_by_random_with_seed_and_offset_sampled(self):
+        response = self.get_response(order='random', seed=1234, limit=6)
+        content = json.loads(response.content.decode('UTF-8'))
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(len(set(page_id_list)), 6)
+
+        response_1 = self.get_response(order='random', seed=1234, limit=3)
+        content_1 = json.loads(response_1.content.decode('UTF-8'))
+        response_2 = self.get_response(order='random', seed=1234, limit=3, offset=3)
+        content_2 = json.loads(response_2.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_page_id_list(content_1) + self.get_page_id_list(content_2), page_id_list)
+
+    @override_settings(WAGTAILAPI_RANDOM_OFFSET_MAX=5)
+    def test_ordering_by_random_with_offset_above_maximum_gives_error(self):
+        response = self.get_response(order='random', seed=1234, offset=6)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "offset cannot be higher than 5 with random ordering"})
+
+    @override_settings(WAGTAILAPI_RANDOM_OFFSET_MAX=5)
+    def test_ordering_by_random_with_maximum_offset(self):
+        response = self.get_response(order='random', seed=1234, offset=5)
+        self.assertEqual(response.status_code, 200)
+
+    def test_ordering_by_random_with_invalid_seed_gives_error(self):
+        response = self.get_response(order='random', seed='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "seed must be a positive integer"})
+
+    def test_seed_without_random_ordering_gives_error(self):
+        response = self.get_response(order='title', seed=1234)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "seed can only be used with random ordering"})
+
+    def test_ordering_default_with_type(self):
+        response = self.get_response(type='tests.BlogEntryPage')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [16, 18, 19])
+
+    def test_ordering_by_title_with_type(self):
+        response = self.get_response(type='tests.BlogEntryPage', order='title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [19, 16, 18])
+
+    def test_ordering_by_specific_field_with_type(self):
+        response = self.get_response(type='tests.BlogEntryPage', order='date')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [16, 18, 19])
+
+    def test_ordering_by_unknown_field_gives_error(self):
+        response = self.get_response(order='not_a_field')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cannot order by 'not_a_field' (unknown field)"})
+
+
+    # LIMIT
+
+    def test_limit_only_two_results_returned(self):
+        response = self.get_response(limit=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(len(content['pages']), 2)
+
+    def test_limit_total_count(self):
+        response = self.get_response(limit=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        # The total count must not be affected by "limit"
+        self.assertEqual(content['meta']['total_count'], get_total_page_count())
+
+    def test_limit_zero_total_count(self):
+        response = self.get_response(limit=0)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        # Clients use this to get the count without any pages
+        self.assertEqual(content['pages'], [])
+        self.assertEqual(content['meta']['total_count'], get_total_page_count())
+
+    def test_total_count_is_fetched_with_results(self):
+        # Warm up any caches (such as content types and site root paths)
+        self.get_response(limit=2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_response(limit=2)
+
+        # The total count doesn't need a query of its own
+        self.assertFalse(any('COUNT(*)' in query['sql'] and '_api_total_count' not in query['sql'] for query in queries.captured_queries))
+
+    def test_limit_not_integer_gives_error(self):
+        response = self.get_response(limit='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "limit must be a positive integer"})
+
+    def test_limit_too_high_gives_error(self):
+        response = self.get_response(limit=1000)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "limit cannot be higher than 20"})
+
+    @override_settings(WAGTAILAPI_LIMIT_MAX=10)
+    def test_limit_maximum_can_be_changed(self):
+        response = self.get_response(limit=20)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "limit cannot be higher than 10"})
+
+    @override_settings(WAGTAILAPI_LIMIT_MAX=2)
+    def test_limit_default_changes_with_max(self):
+        # The default limit is 20. If WAGTAILAPI_LIMIT_MAX is less than that,
+        # the default should change accordingly.
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(len(content['pages']), 2)
+
+
+    # OFFSET
+
+    def test_offset_5_usually_appears_5th_in_list(self):
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list.index(5), 4)
+
+    def test_offset_5_moves_after_offset(self):
+        response = self.get_response(offset=4)
+        content = json.loads(response.content.decode('UTF-8'))
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list.index(5), 0)
+
+    def test_offset_total_count(self):
+        response = self.get_response(offset=10)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        # The total count must not be affected by "offset"
+        self.assertEqual(content['meta']['total_count'], get_total_page_count())
+
+    def test_offset_past_end_total_count(self):
+        response = self.get_response(offset=100)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['pages'], [])
+        self.assertEqual(content['meta']['total_count'], get_total_page_count())
+
+    def test_offset_not_integer_gives_error(self):
+        response = self.get_response(offset='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "offset must be a positive integer"})
+
+
+    # SEARCH
+
+    def test_search_for_blog(self):
+        response = self.get_response(search='blog')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+
+        # Check that the results are the blog index and three blog pages
+        self.assertEqual(set(page_id_list), set([5, 16, 18, 19]))
+
+    def test_search_with_type(self):
+        response = self.get_response(type='tests.BlogEntryPage', search='blog')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+
+        self.assertEqual(set(page_id_list), set([16, 18, 19]))
+
+    def test_search_total_count(self):
+        response = self.get_response(search='blog', limit=1)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        # The total count must not be affected by "limit"
+        self.assertEqual(len(content['pages']), 1)
+        self.assertEqual(content['meta']['total_count'], 4)
+
+    def test_search_with_limit_zero_total_count(self):
+        response = self.get_response(search='blog', limit=0)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['pages'], [])
+        self.assertEqual(content['meta']['total_count'], 4)
+
+    def test_search_with_offset_total_count(self):
+        response = self.get_response(search='blog', offset=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(len(content['pages']), 2)
+        self.assertEqual(content['meta']['total_count'], 4)
+
+    def test_search_with_ordering(self):
+        response = self.get_response(type='tests.BlogEntryPage', search='blog', order='-date')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(page_id_list, [19, 18, 16])
+
+    def test_search_with_random_ordering_gives_error(self):
+        response = self.get_response(search='blog', order='random')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "random ordering with a search query is not supported"})
+
+    @mock.patch('wagtailapi.api.get_search_backend')
+    def test_search_with_ordering_on_backend_without_ordering_gives_error(self, get_search_backend):
+        # Eg, the Elasticsearch backend
+        get_search_backend.return_value = mock.Mock()
+
+        response = self.get_response(type='tests.BlogEntryPage', search='blog', order='-date')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "ordering search results is not supported by the search backend"})
+
+    def test_search_when_ordering_by_unindexed_field_gives_error(self):
+        response = self.get_response(search='blog', order='title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cannot order by 'title' with a search query (field isn't indexed)"})
+
+    @override_settings(WAGTAILAPI_SEARCH_ENABLED=False)
+    def test_search_when_disabled_gives_error(self):
+        response = self.get_response(search='blog')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "search is disabled"})
+
+    def test_search_when_filtering_by_tag(self):
+        response = self.get_response(type='tests.BlogEntryPage', search='blog', tags='wagtail')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        page_id_list = self.get_page_id_list(content)
+        self.assertEqual(set(page_id_list), set([16, 18]))
+
+
+class TestPageDetail(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    def get_response(self, page_id, **params):
+        return self.client.get(reverse('wagtailapi_v1_pages:detail', args=(page_id, )), params)
+
+    def test_status_code(self):
+        response = self.get_response(16)
+        self.assertEqual(response.status_code, 200)
+
+    def test_content_type_header(self):
+        response = self.get_response(16)
+        self.assertEqual(response['Content-type'], 'application/json')
+
+    def test_valid_json(self):
+        response = self.get_response(16)
+
+        # Will crash if there's a problem
+        json.loads(response.content.decode('UTF-8'))
+
+    def test_meta(self):
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn('meta', content)
+        self.assertIsInstance(content['meta'], dict)
+
+    def test_meta_type(self):
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn('type', content['meta'])
+        self.assertEquals(content['meta']['type'], 'tests.BlogEntryPage')
+
+    def test_meta_parent_id(self):
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn('parent', content['meta'])
+        self.assertEquals(content['meta']['parent'], 5)
+
+    def test_meta_parent_id_doesnt_show_root_page(self):
+        # Root page isn't in the site so don't show it if the user is looking at the home page
+        response = self.get_response(2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertNotIn('parent', content['meta'])
+
+    def test_custom_fields(self):
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn('date', content)
+        self.assertEquals(content['date'], '2013-12-02')
+
+        self.assertIn('body', content)
+
+    def test_tags(self):
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn('tags', content)
+        self.assertEqual(content['tags'], ['wagtail', 'bird'])
+
+    def test_child_relations(self):
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn('related_links', content)
+        self.assertEquals(content['related_links'], [])
+
+        self.assertIn('carousel_items', content)
+
+        for carousel_item in content['carousel_items']:
+            self.assertEquals(carousel_item.keys(), {'embed_url', 'link', 'caption', 'image'})
+
+    def test_ancestors(self):
+        response = self.get_response(16, ancestors='true')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['ancestors'], [
+            {'id': 2, 'title': "Home page", 'type': 'tests.HomePage', 'html_url': 'http://localhost/'},
+            {'id': 5, 'title': "Blog index", 'type': 'tests.BlogIndexPage', 'html_url': 'http://localhost/blog-index/'},
+        ])
+
+    def test_ancestors_of_site_root_page(self):
+        response = self.get_response(2, ancestors='true')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['ancestors'], [])
+
+    def test_ancestors_not_shown_by_default(self):
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertNotIn('ancestors', content['meta'])
+
+    def test_ancestors_uses_one_query(self):
+        self.get_response(16)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_response(16)
+
+        with CaptureQueriesContext(connection) as more_queries:
+            self.get_response(16, ancestors='true')
+
+        self.assertEqual(len(more_queries), len(queries) + 1)
+
+    def test_ancestors_invalid_value_gives_error(self):
+        response = self.get_response(16, ancestors='yes')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "ancestors must be 'true' or 'false'"})
+
+    def test_siblings_by_path(self):
+        response = self.get_response(18, siblings='path')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['previous_sibling']['id'], 16)
+        self.assertEqual(content['meta']['next_sibling']['id'], 19)
+
+    def test_siblings_at_end(self):
+        response = self.get_response(19, siblings='path')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['previous_sibling']['id'], 18)
+        self.assertEqual(content['meta']['next_sibling'], None)
+
+    def test_siblings_by_date_descending(self):
+        response = self.get_response(18, siblings='-date')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['previous_sibling']['id'], 19)
+        self.assertEqual(content['meta']['next_sibling']['id'], 16)
+
+    def test_siblings_skip_private_pages(self):
+        Page.objects.get(id=18).view_restrictions.create(password='test')
+
+        response = self.get_response(16, siblings='path')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['next_sibling']['id'], 19)
+
+    def test_siblings_uses_two_queries(self):
+        self.get_response(18)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_response(18)
+
+        with CaptureQueriesContext(connection) as more_queries:
+            self.get_response(18, siblings='path')
+
+        self.assertEqual(len(more_queries), len(queries) + 2)
+
+    def test_siblings_by_non_date_field_gives_error(self):
+        response = self.get_response(16, siblings='body')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cannot order siblings by 'body' (must be path or a date field)"})
+
+    def test_html_url(self):
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['html_url'], 'http://localhost/blog-index/blog-post/')
+
+    def test_expand(self):
+        response = self.get_response(16, expand='feed_image')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['feed_image'], {'id': 7, 'title': "Wagtail by Joe Buckingham"})
+
+
+class TestPageTree(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    def get_response(self, page_id, **params):
+        return self.client.get(reverse('wagtailapi_v1_pages:tree', args=(page_id, )), params)
+
+    def get_tree_ids(self, node):
+        return (node['id'], [self.get_tree_ids(child) for child in node['children']])
+
+    def test_status_code(self):
+        response = self.get_response(6)
+        self.assertEqual(response.status_code, 200)
+
+    def test_tree(self):
+        response = self.get_response(6)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_tree_ids(content), (6, [(10, []), (15, []), (17, []), (21, [])]))
+
+    def test_tree_depth(self):
+        response = self.get_response(6, depth=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_tree_ids(content), (6, [(10, []), (15, []), (17, []), (21, [(22, []), (23, [])])]))
+
+    def test_tree_depth_zero(self):
+        response = self.get_response(6, depth=0)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_tree_ids(content), (6, []))
+
+    def test_tree_fields(self):
+        response = self.get_response(6, fields='title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(set(content.keys()), set(['id', 'meta', 'title', 'children']))
+        self.assertEqual(content['children'][0]['title'], "Standard page 1")
+        self.assertEqual(content['children'][0]['meta']['type'], 'tests.StandardPage')
+
+    def test_tree_unpublished_pages_are_skipped(self):
+        models.StandardIndexPage.objects.get(id=21).unpublish()
+
+        response = self.get_response(6, depth=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        # The children of the unpublished page must not appear anywhere either
+        self.assertEqual(self.get_tree_ids(content), (6, [(10, []), (15, []), (17, [])]))
+
+    def test_tree_unknown_page_gives_404(self):
+        response = self.get_response(1000)
+        self.assertEqual(response.status_code, 404)
+
+    def test_tree_page_thats_not_in_same_site_gives_404(self):
+        response = self.get_response(1)
+        self.assertEqual(response.status_code, 404)
+
+    def test_tree_invalid_depth_gives_error(self):
+        response = self.get_response(6, depth='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "depth must be a positive integer"})
+
+    @override_settings(WAGTAILAPI_TREE_DEPTH_MAX=1)
+    def test_tree_depth_above_maximum_gives_error(self):
+        response = self.get_response(6, depth=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "depth cannot be higher than 1"})
+
+    @override_settings(WAGTAILAPI_TREE_NODES_MAX=5)
+    def test_tree_with_too_many_pages_gives_error(self):
+        response = self.get_response(6, depth=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "tree has more than 5 pages (use a lower depth)"})
+
+    @override_settings(WAGTAILAPI_TREE_NODES_MAX=5)
+    def test_tree_with_maximum_number_of_pages(self):
+        response = self.get_response(6)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_tree_ids(content), (6, [(10, []), (15, []), (17, []), (21, [])]))
+
+    def test_tree_unknown_field_gives_error(self):
+        response = self.get_response(6, fields='title,abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "unknown fields: abc"})
 
 
 @override_settings(
@@ -614,3 +1393,340 @@ class TestPageCacheInvalidation(TestCase):
         Page.objects.get(id=2).save_revision()
 
         purge.assert_not_called()
+
+
+@override_settings(WAGTAILAPI_PAGE_SNAPSHOTS=True)
+class TestPageSnapshots(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    @classmethod
+    def setUpClass(cls):
+        signal_handlers.register_snapshot_signal_handlers()
+
+    @classmethod
+    def tearDownClass(cls):
+        signal_handlers.unregister_snapshot_signal_handlers()
+
+    def get_response(self, page_id, **params):
+        return self.client.get(reverse('wagtailapi_v1_pages:detail', args=(page_id, )), params)
+
+    def test_publish_creates_snapshot(self):
+        Page.objects.get(id=16).specific.save_revision().publish()
+
+        snapshot = PageSnapshot.objects.get(page_id=16)
+        response = self.get_response(16)
+
+        self.assertEqual(response.content.decode('UTF-8'), snapshot.data)
+
+    def test_snapshot_is_served(self):
+        PageSnapshot.objects.create(page_id=16, data='{"snapshot": true}')
+
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response['Content-type'], 'application/json')
+        self.assertEqual(content, {'snapshot': True})
+
+    def test_snapshot_isnt_served_with_query_parameters(self):
+        PageSnapshot.objects.create(page_id=16, data='{"snapshot": true}')
+
+        response = self.get_response(16, fields='title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['id'], 16)
+
+    @override_settings(WAGTAILAPI_PAGE_SNAPSHOTS=False)
+    def test_snapshot_isnt_served_when_disabled(self):
+        PageSnapshot.objects.create(page_id=16, data='{"snapshot": true}')
+
+        response = self.get_response(16)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['id'], 16)
+
+    def test_snapshot_of_private_page_isnt_served(self):
+        PageSnapshot.objects.create(page_id=16, data='{"snapshot": true}')
+        Page.objects.get(id=5).view_restrictions.create(password='test')
+
+        response = self.get_response(16)
+        self.assertEqual(response.status_code, 404)
+
+    def test_unpublish_deletes_snapshot(self):
+        Page.objects.get(id=16).specific.save_revision().publish()
+        Page.objects.get(id=16).specific.unpublish()
+
+        self.assertFalse(PageSnapshot.objects.filter(page_id=16).exists())
+
+    def test_move_expires_snapshots(self):
+        call_command('update_api_snapshots', stdout=six.StringIO())
+
+        # Move "Standard index page" (which has two children) under the homepage
+        Page.objects.get(id=21).move(Page.objects.get(id=2), pos='last-child')
+
+        self.assertFalse(PageSnapshot.objects.filter(page_id__in=[21, 22, 23]).exists())
+        self.assertTrue(PageSnapshot.objects.filter(page_id=16).exists())
+
+        for page_id in (21, 22, 23):
+            response = self.get_response(page_id)
+
+            with override_settings(WAGTAILAPI_PAGE_SNAPSHOTS=False):
+                uncached_response = self.get_response(page_id)
+
+            self.assertEqual(response.content, uncached_response.content)
+
+        content = json.loads(self.get_response(21).content.decode('UTF-8'))
+        self.assertEqual(content['meta']['parent'], 2)
+
+        content = json.loads(self.get_response(22).content.decode('UTF-8'))
+        self.assertEqual(content['meta']['html_url'], 'http://localhost' + Page.objects.get(id=22).url_path[len('/home-page'):])
+
+    def test_update_api_snapshots_command(self):
+        call_command('update_api_snapshots', stdout=six.StringIO())
+
+        # Every page in the site must have a snapshot (not the root page)
+        self.assertEqual(PageSnapshot.objects.count(), get_total_page_count())
+
+        # The snapshots must be the same as the detail view
+        with override_settings(WAGTAILAPI_PAGE_SNAPSHOTS=False):
+            response = self.get_response(16)
+        self.assertEqual(response.content.decode('UTF-8'), PageSnapshot.objects.get(page_id=16).data)
+
+    def test_update_api_snapshots_command_verify(self):
+        call_command('update_api_snapshots', stdout=six.StringIO())
+        call_command('update_api_snapshots', verify=True, stdout=six.StringIO())
+
+        PageSnapshot.objects.filter(page_id=16).update(data='{"snapshot": true}')
+
+        with self.assertRaises(CommandError):
+            call_command('update_api_snapshots', verify=True, stdout=six.StringIO())
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'wagtailapi': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'wagtailapi',
+        },
+    },
+    WAGTAILAPI_CACHE='wagtailapi',
+)
+class TestPageFragmentCache(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    @classmethod
+    def setUpClass(cls):
+        signal_handlers.register_fragment_cache_signal_handlers()
+
+    @classmethod
+    def tearDownClass(cls):
+        signal_handlers.unregister_fragment_cache_signal_handlers()
+
+    def setUp(self):
+        from django.core.cache import caches
+        caches['wagtailapi'].clear()
+
+    def get_response(self, **params):
+        return self.client.get(reverse('wagtailapi_v1_pages:listing'), params)
+
+    def get_page(self, content, page_id):
+        for page in content['pages']:
+            if page['id'] == page_id:
+                return page
+
+    def test_response_matches_uncached_response(self):
+        response = self.get_response(type='tests.BlogEntryPage', fields='title,date,tags')
+        cached_response = self.get_response(type='tests.BlogEntryPage', fields='title,date,tags')
+
+        with override_settings(WAGTAILAPI_CACHE=None):
+            uncached_response = self.get_response(type='tests.BlogEntryPage', fields='title,date,tags')
+
+        self.assertEqual(json.loads(response.content.decode('UTF-8')), json.loads(uncached_response.content.decode('UTF-8')))
+        self.assertEqual(json.loads(cached_response.content.decode('UTF-8')), json.loads(uncached_response.content.decode('UTF-8')))
+
+    def test_empty_listing(self):
+        response = self.get_response(title='Not a page')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['pages'], [])
+
+    def test_fragments_are_reused(self):
+        self.get_response()
+
+        # Change the title without sending any signals
+        Page.objects.filter(id=2).update(title="Changed")
+
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_page(content, 2)['title'], "Home page")
+
+    def test_fragments_vary_on_fields(self):
+        self.get_response(type='tests.BlogEntryPage')
+
+        response = self.get_response(type='tests.BlogEntryPage', fields='title,date')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_page(content, 16)['date'], '2013-12-02')
+
+    def test_publish_expires_fragments(self):
+        self.get_response()
+
+        page = Page.objects.get(id=2).specific
+        page.title = "Changed"
+        page.save_revision().publish()
+
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_page(content, 2)['title'], "Changed")
+
+    def test_save_expires_fragments(self):
+        self.get_response()
+
+        page = Page.objects.get(id=2)
+        page.title = "Changed"
+        page.save()
+
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_page(content, 2)['title'], "Changed")
+
+    def test_move_expires_fragments(self):
+        self.get_response(fields='title,url_path', order='-id')
+
+        # Move "Standard index page" (which has two children) under the homepage
+        Page.objects.get(id=21).move(Page.objects.get(id=2), pos='last-child')
+
+        response = self.get_response(fields='title,url_path', order='-id')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        for page_id in (21, 22, 23):
+            self.assertEqual(self.get_page(content, page_id)['url_path'], Page.objects.get(id=page_id).url_path)
+
+
+class TestPageCompression(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    def get_response(self, accept_encoding, **params):
+        return self.client.get(reverse('wagtailapi_v1_pages:listing'), params, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def decompress(self, content):
+        return gzip.GzipFile(fileobj=six.BytesIO(content)).read()
+
+    def test_gzip(self):
+        response = self.get_response('gzip')
+        uncompressed_response = self.get_response('')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(self.decompress(response.content), uncompressed_response.content)
+
+    def test_vary_header(self):
+        response = self.get_response('gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_no_accept_encoding(self):
+        response = self.get_response('')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_gzip_not_acceptable(self):
+        response = self.get_response('gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_small_responses_arent_compressed(self):
+        response = self.get_response('gzip', limit='abc')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(WAGTAILAPI_COMPRESSION=False)
+    def test_compression_disabled(self):
+        response = self.get_response('gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'wagtailapi': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'wagtailapi_compression',
+            },
+        },
+        WAGTAILAPI_CACHE='wagtailapi',
+        WAGTAILAPI_PAGE_SNAPSHOTS=True,
+    )
+    def test_compressed_snapshots_are_cached(self):
+        from django.core.cache import caches
+
+        PagesAPIEndpoint().update_snapshot(Page.objects.get(id=16).specific)
+        snapshot = PageSnapshot.objects.get(page_id=16)
+
+        response = self.client.get(reverse('wagtailapi_v1_pages:detail', args=(16, )), HTTP_ACCEPT_ENCODING='gzip')
+
+        cache_key = 'wagtailapi:snapshot:%d:%s:gzip' % (snapshot.page_id, snapshot.created_at.isoformat())
+        self.assertEqual(caches['wagtailapi'].get(cache_key), response.content)
+        self.assertEqual(self.decompress(response.content).decode('UTF-8'), snapshot.data)
+
+
+class TestPageRenderers(TestCase):
+    fixtures = ['wagtailapi_tests.json']
+
+    def get_response(self, accept, **params):
+        return self.client.get(reverse('wagtailapi_v1_pages:listing'), params, HTTP_ACCEPT=accept)
+
+    def get_json_content(self, **params):
+        response = self.client.get(reverse('wagtailapi_v1_pages:listing'), params)
+        return json.loads(response.content.decode('UTF-8'))
+
+    def test_json_is_default(self):
+        response = self.get_response('text/html, */*')
+        self.assertEqual(response['Content-type'], 'application/json')
+
+    def test_unsupported_format_gives_json(self):
+        response = self.get_response('application/xml')
+        self.assertEqual(response['Content-type'], 'application/json')
+
+    def test_vary_header(self):
+        response = self.get_response('application/json')
+        self.assertIn('Accept', response['Vary'])
+
+    def test_json_response(self):
+        # Kept for subclasses that build their own responses
+        response = PagesAPIEndpoint().json_response({'date': datetime.date(2015, 1, 1)})
+
+        self.assertEqual(response['Content-type'], 'application/json')
+        self.assertEqual(json.loads(response.content.decode('UTF-8')), {'date': '2015-01-01'})
+
+    @unittest.skipIf(renderers.msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        response = self.get_response('application/msgpack', type='tests.BlogEntryPage', fields='title,date,tags')
+        content = renderers.msgpack.unpackb(response.content, raw=False)
+
+        self.assertEqual(response['Content-type'], 'application/msgpack')
+        self.assertEqual(content, self.get_json_content(type='tests.BlogEntryPage', fields='title,date,tags'))
+
+    @unittest.skipIf(renderers.msgpack is None, "msgpack is not installed")
+    def test_msgpack_quality(self):
+        response = self.get_response('application/json;q=0.5, application/x-msgpack')
+        self.assertEqual(response['Content-type'], 'application/msgpack')
+
+    @unittest.skipIf(renderers.msgpack is None, "msgpack is not installed")
+    def test_msgpack_error(self):
+        response = self.get_response('application/msgpack', limit='abc')
+        content = renderers.msgpack.unpackb(response.content, raw=False)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "limit must be a positive integer"})
+
+    @unittest.skipIf(renderers.cbor2 is None, "cbor2 is not installed")
+    def test_cbor(self):
+        response = self.get_response('application/cbor', type='tests.BlogEntryPage', fields='title,date,tags')
+        content = renderers.cbor2.loads(response.content)
+
+        self.assertEqual(response['Content-type'], 'application/cbor')
+        self.assertEqual(content, self.get_json_content(type='tests.BlogEntryPage', fields='title,date,tags'))
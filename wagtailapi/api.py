@@ -1,40 +1,49 @@
 from __future__ import absolute_import
 
+import re
 import json
+import time
+import hashlib
+import operator
+import datetime
 import urllib
 from functools import wraps
 from collections import OrderedDict
 
+import six
 from modelcluster.models import get_all_child_relations
 from taggit.managers import _TaggableManager
-from taggit.models import Tag
 
 from django.db import models
 from django.utils.encoding import force_text
-from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotFound, Http404
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils import timezone
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, StreamingHttpResponse, HttpResponseBadRequest, HttpResponseNotFound, Http404
 from django.shortcuts import get_object_or_404
 from django.core.paginator import Paginator, EmptyPage
-from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_vary_headers
 from django.conf.urls import url
+from django.core.urlresolvers import reverse
 from django.conf import settings
 
 from wagtail.wagtailcore.models import Page
-from wagtail.wagtailimages.models import get_image_model
+from wagtail.wagtailimages.models import get_image_model, Filter
 from wagtail.wagtaildocs.models import Document
 from wagtail.wagtailcore.utils import resolve_model_string
 from wagtail.wagtailsearch.backends import get_search_backend
+from wagtail.wagtailsearch.backends.base import FilterError, FieldError
+from wagtail.wagtailsearch.backends.db import DBSearch
+from wagtail.wagtailsearch import index
 
-from .utils import get_base_url
-
-
-class WagtailAPIJSONEncoder(DjangoJSONEncoder):
-    def default(self, o):
-        if isinstance(o, _TaggableManager):
-            return list(o.all())
-        elif isinstance(o, Tag):
-            return o.name
-        else:
-            return super(WagtailAPIJSONEncoder, self).default(o)
+from .utils import (
+    get_base_url, get_results_window, get_random_window, get_site_for_page,
+    get_site_root_paths, get_page_html_url, get_page_type_name, get_page_content_type_ids,
+    get_api_cache, get_object_versions, compress_response,
+    get_sync_retention_days, get_sync_window_start
+)
+from .models import PageSnapshot, Tombstone, Modification, DocumentMetadata
+from .brokers import get_change_broker
+from .renderers import WagtailAPIJSONEncoder, JSONRenderer, get_renderer
 
 
 def get_api_data(obj, fields):
@@ -71,18 +80,61 @@ def get_api_data(obj, fields):
             continue
 
 
+# Image filter specs that can be used in the "rendition" parameter
+# Eg: fill-200x200, max-800x600, fill-200x200-c50, width-400, original
+RENDITION_FILTER_SPEC_REGEX = re.compile(r'^(original|(max|min|fill)-\d+x\d+(-c\d+)?|(width|height)-\d+)$')
+
+
+def get_indexed_filter_fields(model):
+    """
+    This returns the names of the fields that the search backend can
+    filter and sort search results on.
+    """
+    if not hasattr(model, 'get_search_fields'):
+        return []
+
+    return [
+        field.field_name for field in model.get_search_fields()
+        if isinstance(field, index.FilterField)
+    ]
+
+
+def search_backend_supports_ordering(backend):
+    """
+    The database backend searches within the queryset that it is given so
+    it keeps the queryset's ordering. Other backends (such as Elasticsearch)
+    always return results in order of relevance.
+    """
+    return isinstance(backend, DBSearch)
+
+
 class BaseAPIEndpoint(object):
     class BadRequestError(Exception):
         pass
 
+    # The name of the endpoint. This is used as the key of the listing in
+    # listing responses
+    name = None
+
     known_query_parameters = (
         'limit',
         'offset',
         'fields',
         'order',
+        'seed',
         'search',
+        'changed_since',
+        'expand',
+        'include',
     )
 
+    # The timestamp field that "changed_since" filters on (if any)
+    changed_since_field = None
+
+    # Set on endpoints whose objects have Modification records (see
+    # signal_handlers.record_modification)
+    records_modifications = False
+
     def get_full_url(self, request, path):
         base_url = get_base_url(request) or ''
         return base_url + path
@@ -136,19 +188,155 @@ class BaseAPIEndpoint(object):
             if bad_fields:
                 raise self.BadRequestError("unknown fields: %s" % ', '.join(bad_fields))
 
-        data.extend(get_api_data(obj, fields))
+        data.extend(self.get_api_data(obj, fields))
 
         return OrderedDict(data)
 
+    def get_api_data(self, obj, fields):
+        """
+        This returns (field name, value) pairs for the fields of an object.
+        Endpoints can override this for fields that aren't on the object.
+        """
+        return get_api_data(obj, fields)
+
+    def serialize_objects(self, request, objects, fields=(), all_fields=False, show_details=False):
+        """
+        This serialises a list of objects. Endpoints can override this to
+        add data that is more efficient to load for all of the objects at
+        once.
+        """
+        return [
+            self.serialize_object(request, obj, fields=fields, all_fields=all_fields, show_details=show_details)
+            for obj in objects
+        ]
+
     def check_query_parameters(self, request, queryset):
         query_parameters = set(request.GET.keys())
 
         # All query paramters must be either a field or an operation
         allowed_query_parameters = set(list(self.known_query_parameters) + self.get_api_fields(queryset.model))
         bad_parameters = query_parameters - allowed_query_parameters
+
+        # Renditions can also be requested for images that are expanded or
+        # included from other endpoints
+        if 'rendition' in bad_parameters and self.has_related_images(request, queryset.model):
+            bad_parameters.discard('rendition')
+
         if bad_parameters:
             raise self.BadRequestError("query parameter is not an operation or a recognised field: %s" % ', '.join(bad_parameters))
 
+        # Check the fields to expand and include now so errors are raised
+        # for empty listings too
+        self.get_expand_fields(request, queryset.model)
+        self.get_include_paths(request, queryset.model)
+        self.get_rendition_filter_spec(request)
+
+    def get_relation_endpoint(self, model, field_name):
+        """
+        This returns the endpoint of the objects that a foreign key points
+        to (or None if the field isn't a foreign key to pages, images or
+        documents)
+        """
+        try:
+            field = model._meta.get_field(field_name)
+        except models.fields.FieldDoesNotExist:
+            return
+
+        if not isinstance(field, models.ForeignKey):
+            return
+
+        related_model = field.rel.to
+        if issubclass(related_model, Page):
+            return PagesAPIEndpoint()
+        elif issubclass(related_model, get_image_model()):
+            return ImagesAPIEndpoint()
+        elif issubclass(related_model, Document):
+            return DocumentsAPIEndpoint()
+
+    def has_related_images(self, request, model):
+        """
+        This returns True if the "expand" or "include" parameters add any
+        images to the response
+        """
+        endpoints = [self.get_relation_endpoint(model, field_name) for field_name in self.get_expand_fields(request, model)]
+        endpoints.extend(endpoint for path, endpoint in self.get_include_paths(request, model))
+
+        return any(isinstance(endpoint, ImagesAPIEndpoint) for endpoint in endpoints)
+
+    def get_rendition_filter_spec(self, request):
+        """
+        This returns the image filter spec from the "rendition" parameter
+        after checking that it is valid and allowed by the
+        WAGTAILAPI_RENDITION_FILTERS setting
+        """
+        if 'rendition' not in request.GET:
+            return
+
+        return self.check_rendition_filter_spec(request.GET['rendition'])
+
+    def check_rendition_filter_spec(self, filter_spec):
+        if not RENDITION_FILTER_SPEC_REGEX.match(filter_spec):
+            raise self.BadRequestError("rendition must be an image filter spec (eg, fill-200x200)")
+
+        # Creating renditions is expensive so only filter specs that are
+        # listed in the settings can be used
+        allowed_filter_specs = getattr(settings, 'WAGTAILAPI_RENDITION_FILTERS', [])
+        if filter_spec not in allowed_filter_specs:
+            raise self.BadRequestError("rendition '%s' is not allowed" % filter_spec)
+
+        return filter_spec
+
+    def get_expand_fields(self, request, model):
+        """
+        This returns the list of fields in the "expand" parameter after
+        checking that they can be expanded
+        """
+        if 'expand' not in request.GET:
+            return []
+
+        expand_fields = request.GET['expand'].split(',')
+        api_fields = self.get_api_fields(model)
+
+        for field_name in expand_fields:
+            if field_name not in api_fields or self.get_relation_endpoint(model, field_name) is None:
+                raise self.BadRequestError("cannot expand '%s' (not a relation to a page, image or document)" % field_name)
+
+        return expand_fields
+
+    def do_expand(self, request, objects, serialized_objects, expand_fields):
+        """
+        This replaces the ids of related objects in the serialised objects
+        with the related object's representation in its own endpoint.
+
+        The related objects are loaded with a single query for each field
+        and are only included if they are visible through their endpoint.
+        """
+        if not objects:
+            return
+
+        for field_name in expand_fields:
+            endpoint = self.get_relation_endpoint(type(objects[0]), field_name)
+            attname = objects[0]._meta.get_field(field_name).attname
+
+            related_ids = set(getattr(obj, attname) for obj in objects)
+            related_ids.discard(None)
+            related_objects = list(endpoint.get_queryset(request).filter(pk__in=related_ids)) if related_ids else []
+            serialized_related_objects = dict(
+                (related_object.pk, data)
+                for related_object, data in zip(related_objects, endpoint.serialize_objects(request, related_objects, fields=('title', )))
+            )
+
+            for obj, data in zip(objects, serialized_objects):
+                data[field_name] = serialized_related_objects.get(getattr(obj, attname))
+
+    def get_field_lookup(self, field_name):
+        """
+        This returns the database lookup to filter and order by an API
+        field. Endpoints can override this for fields that are stored on
+        other models.
+        """
+        return field_name
+
     def do_field_filtering(self, request, queryset):
         """
         This performs field level filtering on the result set
@@ -157,22 +345,114 @@ class BaseAPIEndpoint(object):
         fields = self.get_api_fields(queryset.model)
 
         for field_name, value in request.GET.items():
-            if field_name in fields:
+            # Operations take priority over fields with the same name
+            if field_name in fields and field_name not in self.known_query_parameters:
                 field = getattr(queryset.model, field_name, None)
 
                 if isinstance(field, _TaggableManager):
-                    for tag in value.split(','):
-                        queryset = queryset.filter(**{field_name + '__name': tag})
-
-                    # Stick a message on the queryset to indicate that tag filtering has been performed
-                    # This will let the do_search method know that it must raise an error as searching
-                    # and tag filtering at the same time is not supported
-                    queryset._filtered_by_tag = True
+                    queryset = self.do_tag_filtering(queryset, field_name, value)
                 else:
-                    queryset = queryset.filter(**{field_name: value})
+                    queryset = queryset.filter(**{self.get_field_lookup(field_name): value})
 
         return queryset
 
+    def get_boolean_parameter(self, request, name):
+        """
+        This returns the value of a query parameter that can be set to
+        "true" or "false" (defaults to False if it isn't set)
+        """
+        value = request.GET.get(name, 'false')
+
+        if value not in ('true', 'false'):
+            raise self.BadRequestError("%s must be 'true' or 'false'" % name)
+
+        return value == 'true'
+
+    def get_changed_since(self, request):
+        """
+        This returns the value of the "changed_since" parameter as an aware
+        datetime (or None if it wasn't set)
+        """
+        if 'changed_since' not in request.GET:
+            return
+
+        value = request.GET['changed_since']
+
+        try:
+            changed_since = parse_datetime(value)
+
+            if changed_since is None:
+                date = parse_date(value)
+
+                if date is not None:
+                    changed_since = datetime.datetime.combine(date, datetime.time())
+        except ValueError:
+            changed_since = None
+
+        if changed_since is None:
+            raise self.BadRequestError("changed_since must be a valid date/time")
+
+        if settings.USE_TZ and timezone.is_naive(changed_since):
+            changed_since = timezone.make_aware(changed_since, timezone.get_default_timezone())
+
+        # Records of removed objects are only kept for a limited time
+        if changed_since < get_sync_window_start():
+            raise self.BadRequestError("changed_since cannot be more than %d days ago (fetch the full listing instead)" % get_sync_retention_days())
+
+        return changed_since
+
+    def do_changed_since_filter(self, request, queryset):
+        """
+        This filters the result set to objects that have changed since a
+        particular time
+        Eg: ?changed_since=2015-01-23T10:00:00
+
+        Objects that have been removed since then are listed in the "deleted"
+        section of the listing meta.
+        """
+        changed_since = self.get_changed_since(request)
+
+        if changed_since is not None:
+            changed = []
+
+            if self.changed_since_field is not None:
+                changed.append(models.Q(**{self.changed_since_field + '__gte': changed_since}))
+
+            # Include objects that have been saved (or published) since then
+            if self.records_modifications:
+                modified_ids = Modification.objects.filter(endpoint=self.name, modified_at__gte=changed_since).values('object_id')
+                changed.append(models.Q(pk__in=modified_ids))
+
+            queryset = queryset.filter(six.moves.reduce(operator.or_, changed))
+
+        return queryset
+
+    def do_tag_filtering(self, queryset, field_name, value):
+        """
+        This filters the result set by a list of tags
+        Eg: ?tags=wagtail,bird -- Items tagged with both "wagtail" and "bird"
+
+        Tags can also be separated with "|" to match any of them
+        Eg: ?tags=wagtail|bird -- Items tagged with "wagtail" or "bird"
+
+        Both are performed with a single subquery so the cost of the query
+        doesn't grow with the number of tags.
+        """
+        model = queryset.model
+
+        if '|' in value:
+            tags = set(value.split('|'))
+            matching_objects = model._default_manager.filter(**{field_name + '__name__in': tags})
+        else:
+            # Group the tagged objects and only keep the ones that matched every tag
+            tags = set(value.split(','))
+            matching_objects = model._default_manager.filter(**{field_name + '__name__in': tags}) \
+                .values('pk') \
+                .annotate(matched_tag_count=models.Count(field_name, distinct=True)) \
+                .filter(matched_tag_count=len(tags))
+
+        return queryset.filter(pk__in=matching_objects.values('pk'))
+
     def do_ordering(self, request, queryset):
         """
         This applies ordering to the result set
@@ -183,21 +463,48 @@ class BaseAPIEndpoint(object):
 
         And random ordering
         Eg: ?order=random
+
+        Random ordering can be given a seed so the same ordering can be
+        paginated through
+        Eg: ?order=random&seed=1234&offset=20
+
+        Search results can be ordered by any field that is indexed as a
+        filter field, if the search backend supports it (only the database
+        backend does).
+        Eg: ?search=James Joyce&order=-date
         """
-        if 'order' in request.GET:
-            # Prevent ordering while searching
-            if 'search' in request.GET:
-                raise self.BadRequestError("ordering with a search query is not supported")
+        if 'seed' in request.GET and request.GET.get('order') != 'random':
+            raise self.BadRequestError("seed can only be used with random ordering")
 
+        if 'order' in request.GET:
             order_by = request.GET['order']
 
             # Random ordering
             if order_by == 'random':
-                # Prevent ordering by random with offset
-                if 'offset' in request.GET:
-                    raise self.BadRequestError("random ordering with offset is not supported")
-
-                return queryset.order_by('?')
+                # Prevent ordering by random while searching
+                if 'search' in request.GET:
+                    raise self.BadRequestError("random ordering with a search query is not supported")
+
+                if 'seed' in request.GET:
+                    try:
+                        seed = int(request.GET['seed'])
+                        assert seed >= 0
+                    except (ValueError, AssertionError):
+                        raise self.BadRequestError("seed must be a positive integer")
+                else:
+                    # Prevent ordering by random with offset
+                    # Pages of an unseeded random ordering wouldn't line up
+                    if 'offset' in request.GET:
+                        raise self.BadRequestError("random ordering with offset is not supported")
+
+                    seed = None
+
+                # Stick a message on the queryset to indicate that it must be
+                # randomly sampled. This is done by do_pagination as it needs
+                # to know how many results to sample.
+                queryset._random_ordering = True
+                queryset._random_ordering_seed = seed
+                return queryset
 
             # Check if reverse ordering is set
             if order_by.startswith('-'):
@@ -208,7 +515,15 @@ class BaseAPIEndpoint(object):
 
             # Add ordering
             if order_by == 'id' or order_by in self.get_api_fields(queryset.model):
-                queryset = queryset.order_by(order_by)
+                if 'search' in request.GET:
+                    if not search_backend_supports_ordering(get_search_backend()):
+                        raise self.BadRequestError("ordering search results is not supported by the search backend")
+
+                    # Search backends can only sort on indexed fields
+                    if order_by not in get_indexed_filter_fields(queryset.model):
+                        raise self.BadRequestError("cannot order by '%s' with a search query (field isn't indexed)" % order_by)
+
+                queryset = queryset.order_by(self.get_field_lookup(order_by))
             else:
                 # Unknown field
                 raise self.BadRequestError("cannot order by '%s' (unknown field)" % order_by)
@@ -230,14 +545,14 @@ class BaseAPIEndpoint(object):
             if not search_enabled:
                 raise self.BadRequestError("search is disabled")
 
-            # Searching and filtering by tag at the same time is not supported
-            if getattr(queryset, '_filtered_by_tag', False):
-                raise self.BadRequestError("filtering by tag with a search query is not supported")
-
             search_query = request.GET['search']
 
             sb = get_search_backend()
-            queryset = sb.search(search_query, queryset)
+            try:
+                queryset = sb.search(search_query, queryset)
+            except (FilterError, FieldError) as e:
+                # The search backend couldn't apply one of the filters
+                raise self.BadRequestError("cannot filter search results: %s" % e)
 
         return queryset
 
@@ -245,6 +560,11 @@ class BaseAPIEndpoint(object):
         """
         This performs limit/offset based pagination on the result set
         Eg: ?limit=10&offset=20 -- Returns 10 items starting at item 20
+
+        Returns the requested window of results along with the total number
+        of results. Only the requested window is retrieved from the database
+        or search backend, and database queries fetch the total count along
+        with it.
         """
         limit_max = getattr(settings, 'WAGTAILAPI_LIMIT_MAX', 20)
 
@@ -267,39 +587,303 @@ class BaseAPIEndpoint(object):
         start = offset
         stop = offset + limit
 
-        return queryset[start:stop]
+        if getattr(queryset, '_random_ordering', False):
+            # Every result before the window has to be sampled too
+            random_offset_max = getattr(settings, 'WAGTAILAPI_RANDOM_OFFSET_MAX', 100)
+            if offset > random_offset_max:
+                raise self.BadRequestError("offset cannot be higher than %d with random ordering" % random_offset_max)
+
+            return get_random_window(queryset, start, stop, seed=queryset._random_ordering_seed)
+
+        return get_results_window(queryset, start, stop)
+
+    def serialize_listing_metadata(self, request, total_count):
+        """
+        This returns a JSON-serialisable dict to use for the "meta"
+        section of a listing.
+        """
+        data = OrderedDict([
+            ('total_count', total_count),
+        ])
+
+        # Tell clients that are syncing which objects have been removed
+        changed_since = self.get_changed_since(request)
+        if changed_since is not None:
+            deleted_max = getattr(settings, 'WAGTAILAPI_DELETED_MAX', 1000)
+            deleted = list(
+                Tombstone.objects.filter(endpoint=self.name, deleted_at__gte=changed_since)
+                .order_by('object_id')
+                .values_list('object_id', flat=True)
+                .distinct()[:deleted_max + 1]
+            )
+
+            if len(deleted) > deleted_max:
+                raise self.BadRequestError("too many objects have been removed since changed_since (fetch the full listing instead)")
+
+            data['deleted'] = deleted
+
+        return data
+
+    def get_include_endpoint(self, model, path):
+        """
+        This returns the endpoint of the objects that a path in the
+        "include" parameter points to. Paths are either a foreign key field
+        (eg "feed_image") or a foreign key field on the objects of a child
+        relation (eg "carousel_items.image").
+
+        Returns None if the path doesn't point to pages, images or documents.
+        """
+        field_name, _, child_field_name = path.partition('.')
+
+        if field_name not in self.get_api_fields(model):
+            return
+
+        if not child_field_name:
+            return self.get_relation_endpoint(model, field_name)
+
+        child_relations = {
+            child_relation.field.rel.related_name: child_relation.model
+            for child_relation in get_all_child_relations(model)
+        }
+        child_model = child_relations.get(field_name)
+
+        if child_model is None or child_field_name not in getattr(child_model, 'api_fields', ()):
+            return
+
+        return self.get_relation_endpoint(child_model, child_field_name)
+
+    def get_include_paths(self, request, model):
+        """
+        This returns a list of (path, endpoint) tuples for the paths in the
+        "include" parameter after checking that they can be included. The
+        paths are split into field names.
+        """
+        if 'include' not in request.GET:
+            return []
+
+        include_paths = []
+        for path in request.GET['include'].split(','):
+            endpoint = self.get_include_endpoint(model, path)
+
+            if endpoint is None:
+                raise self.BadRequestError("cannot include '%s' (not a relation to a page, image or document)" % path)
+
+            include_paths.append((path.split('.'), endpoint))
+
+        return include_paths
+
+    def get_included_objects(self, request, serialized_objects, include_paths):
+        """
+        This returns the "included" section of a response. This contains
+        each object that the serialised objects refer to in the included
+        paths, grouped by endpoint and keyed by id.
+
+        Objects that are referred to more than once are only fetched and
+        serialised once. Each endpoint's objects are fetched in one query.
+        """
+        ids_by_endpoint = OrderedDict()
+        for path, endpoint in include_paths:
+            endpoint, ids = ids_by_endpoint.setdefault(endpoint.name, (endpoint, set()))
+
+            for data in serialized_objects:
+                values = [data.get(path[0])]
+
+                # Child relations are lists of dicts
+                if len(path) > 1:
+                    values = [child_data.get(path[1]) for child_data in values[0] or []]
+
+                ids.update(value for value in values if isinstance(value, six.integer_types))
+
+        included = OrderedDict()
+        for endpoint_name, (endpoint, ids) in ids_by_endpoint.items():
+            objects = list(endpoint.get_queryset(request).filter(pk__in=ids).order_by('pk')) if ids else []
+
+            included[endpoint_name] = OrderedDict(
+                (str(obj.pk), data)
+                for obj, data in zip(objects, endpoint.serialize_objects(request, objects, fields=('title', )))
+            )
+
+        return included
+
+    def listing_response(self, request, total_count, objects, fields):
+        """
+        This builds the response for a listing view
+
+        If the API cache is enabled, each object is serialised to a JSON
+        fragment that is cached and joined into the response as is.
+        """
+        objects = list(objects)
+        expand_fields = self.get_expand_fields(request, type(objects[0])) if objects else []
+        include_paths = self.get_include_paths(request, type(objects[0])) if objects else []
+
+        # The fields that are included from must be in the objects
+        fields = list(fields) + [
+            path[0] for path, endpoint in include_paths
+            if path[0] not in fields
+        ]
+
+        if not self.can_use_fragment_cache(request):
+            serialized_objects = self.serialize_objects(request, objects, fields=fields)
+            self.do_expand(request, objects, serialized_objects, expand_fields)
+
+            data = OrderedDict([
+                ('meta', self.serialize_listing_metadata(request, total_count)),
+                (self.name, serialized_objects),
+            ])
+
+            if 'include' in request.GET:
+                data['included'] = self.get_included_objects(request, serialized_objects, include_paths)
+
+            return self.render_response(request, data)
+
+        meta = self.json_encode(self.serialize_listing_metadata(request, total_count))
+        fragments = self.get_serialized_fragments(request, objects, fields)
+
+        # Put the document together around the fragments, indenting them
+        # to match the output of json_encode
+        if fragments:
+            items = '[\n%s\n    ]' % ',\n'.join(
+                ' ' * 8 + fragment.replace('\n', '\n' + ' ' * 8)
+                for fragment in fragments
+            )
+        else:
+            items = '[]'
+
+        data = '{\n    "meta": %s,\n    %s: %s\n}' % (
+            meta.replace('\n', '\n' + ' ' * 4),
+            json.dumps(self.name),
+            items,
+        )
+
+        return HttpResponse(data, content_type='application/json')
+
+    def can_use_fragment_cache(self, request):
+        """
+        Fragments are only of the JSON representation of objects on their
+        own. Other formats and listings with related objects or renditions
+        are always serialised from scratch.
+        """
+        if get_api_cache() is None:
+            return False
+
+        if not isinstance(get_renderer(request), JSONRenderer):
+            return False
+
+        return not any(parameter in request.GET for parameter in ('expand', 'include', 'rendition'))
+
+    def get_fragment_cache_key(self, request, obj, fields, version):
+        """
+        This returns the key to cache the serialised version of an object
+        under. This must vary on anything that changes how the object is
+        serialised.
+        """
+        params = [
+            obj._meta.app_label + '.' + obj._meta.model_name,
+            ','.join(fields),
+            str(getattr(getattr(request, 'site', None), 'id', '')),
+        ]
+
+        # Moving a page changes the url_path of all of its descendants
+        # without sending any signals for them
+        if isinstance(obj, Page):
+            params.append(obj.url_path)
+
+        return 'wagtailapi:fragment:%s:%d:%s:%s' % (
+            self.name,
+            obj.pk,
+            version,
+            hashlib.md5(':'.join(params).encode('utf-8')).hexdigest(),
+        )
+
+    def get_serialized_fragments(self, request, objects, fields):
+        """
+        This returns a list of JSON-encoded objects from the API cache,
+        serialising and caching any that are missing.
+
+        Cached fragments are looked up with a single multi-get.
+        """
+        cache = get_api_cache()
+        objects = list(objects)
+
+        versions = get_object_versions(self.name, [obj.pk for obj in objects])
+        keys = [
+            self.get_fragment_cache_key(request, obj, fields, versions[obj.pk])
+            for obj in objects
+        ]
+        cached_fragments = cache.get_many(keys)
+
+        # Serialise the missing objects together
+        missing_objects = [obj for obj, key in zip(objects, keys) if key not in cached_fragments]
+        new_fragments = dict(
+            (self.get_fragment_cache_key(request, obj, fields, versions[obj.pk]), self.json_encode(data))
+            for obj, data in zip(missing_objects, self.serialize_objects(request, missing_objects, fields=fields))
+        )
+
+        fragments = [
+            cached_fragments.get(key) or new_fragments[key]
+            for key in keys
+        ]
+
+        if new_fragments:
+            cache.set_many(new_fragments)
+
+        return fragments
+
+    def json_encode(self, data):
+        """
+        This takes a JSON-serialisable thing and encodes it as JSON
+        """
+        return json.dumps(data, indent=4, cls=WagtailAPIJSONEncoder)
 
     def json_response(self, data, response_cls=HttpResponse):
         """
-        This takes a JSON-serialisable thing and builds a HTTP response
-        from it
+        This takes a JSON-serialisable thing and builds a JSON HTTP response
+        from it (use render_response to respond in the client's format)
         """
+        # Requests without an "Accept" header always get JSON
+        return self.render_response(HttpRequest(), data, response_cls=response_cls)
+
+    def render_response(self, request, data, response_cls=HttpResponse):
+        """
+        This takes a JSON-serialisable thing and builds a HTTP response from
+        it in the format that the client asked for in the "Accept" header
+        """
+        renderer = get_renderer(request)
+
         return response_cls(
-            json.dumps(data, indent=4, cls=WagtailAPIJSONEncoder),
-            content_type='application/json'
+            renderer.render(data),
+            content_type=renderer.media_type
         )
 
     def api_view(self, view):
         """
         This is a decorator that is applied to all API views.
 
-        It's only job currently is to catch Http404 and BadRequestError
-        exceptions and convert them into nicer error messages for the user.
+        It catches Http404 and BadRequestError exceptions and converts them
+        into nicer error messages for the user. It also compresses the
+        response if the client supports it.
         """
         @wraps(view)
-        def wrapper(*args, **kwargs):
+        def wrapper(request, *args, **kwargs):
             # Catch exceptions and format them as JSON documents
             try:
-                return view(*args, **kwargs)
+                response = view(request, *args, **kwargs)
             except Http404 as e:
-                return self.json_response({
+                response = self.render_response(request, {
                     'message': str(e)
                 }, response_cls=HttpResponseNotFound)
             except self.BadRequestError as e:
-                return self.json_response({
+                response = self.render_response(request, {
                     'message': str(e)
                 }, response_cls=HttpResponseBadRequest)
 
+            patch_vary_headers(response, ('Accept', ))
+
+            if getattr(settings, 'WAGTAILAPI_COMPRESSION', True):
+                compress_response(request, response)
+
+            return response
+
         return wrapper
 
     def get_urlpatterns(self):
@@ -313,23 +897,49 @@ class BaseAPIEndpoint(object):
 
 
 class PagesAPIEndpoint(BaseAPIEndpoint):
+    name = 'pages'
+
+    # Pages are recorded when they are published or moved. A new revision
+    # doesn't change a page until it's published (which may be much later
+    # if it's scheduled)
+    records_modifications = True
+
     known_query_parameters = BaseAPIEndpoint.known_query_parameters + (
         'type',
         'child_of',
         'descendant_of',
+        'depth',
+        'children_count',
     )
 
     def get_queryset(self, request, model=Page):
         # Get live pages that are not in a private section
-        queryset = model.objects.public().live()
+        return self.get_public_queryset(request, model=model).live()
+
+    def get_public_queryset(self, request, model=Page):
+        """
+        Returns pages in the site that are not in a private section,
+        including pages that aren't live
+        """
+        queryset = model.objects.public()
 
         # Filter by site
         queryset = queryset.descendant_of(request.site.root_page, inclusive=True)
 
         return queryset
 
+    # Fields from the page table that all pages have. These can be used
+    # without selecting a type.
+    base_fields = (
+        'title',
+        'slug',
+        'url_path',
+        'depth',
+        'latest_revision_created_at',
+    )
+
     def get_api_fields(self, model):
-        api_fields = ['title']
+        api_fields = list(self.base_fields)
         api_fields.extend(super(PagesAPIEndpoint, self).get_api_fields(model))
         return api_fields
 
@@ -337,7 +947,10 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
         data = super(PagesAPIEndpoint, self).serialize_object_metadata(request, page, show_details=show_details)
 
         # Add type
-        data['type'] = page.specific_class._meta.app_label + '.' + page.specific_class.__name__
+        data['type'] = get_page_type_name(page.content_type_id)
+
+        # Add URL of the page on the site
+        data['html_url'] = get_page_html_url(page, get_site_root_paths(request))
 
         # Add parent id
         if show_details:
@@ -349,15 +962,131 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
 
         return data
 
-    def get_model(self, request):
+    def get_children_counts(self, request, pages):
+        """
+        This returns a dict of page paths to the number of visible children
+        each of the pages has
+
+        The counts are made in a single grouped query. Pages that treebeard
+        knows have no children at all are left out of the query.
+        """
+        pages = [page for page in pages if page.numchild]
+        if not pages:
+            return {}
+
+        children_filter = models.Q()
+        for page in pages:
+            children_filter |= models.Q(path__startswith=page.path, depth=page.depth + 1)
+
+        # The parent's path is the child's path without its last step
+        parent_path_sql = 'SUBSTR(%s.path, 1, LENGTH(%s.path) - %d)' % (Page._meta.db_table, Page._meta.db_table, Page.steplen)
+
+        counts = self.get_queryset(request).filter(children_filter) \
+            .extra(select={'parent_path': parent_path_sql}) \
+            .values('parent_path') \
+            .annotate(children_count=models.Count('id')) \
+            .order_by()
+
+        return dict((count['parent_path'], count['children_count']) for count in counts)
+
+    def serialize_objects(self, request, pages, fields=(), all_fields=False, show_details=False):
+        serialized_pages = super(PagesAPIEndpoint, self).serialize_objects(request, pages, fields=fields, all_fields=all_fields, show_details=show_details)
+
+        # Add children counts
+        if self.get_boolean_parameter(request, 'children_count'):
+            children_counts = self.get_children_counts(request, pages)
+
+            for page, data in zip(pages, serialized_pages):
+                data['meta']['children_count'] = children_counts.get(page.path, 0)
+                data['meta']['has_children'] = data['meta']['children_count'] > 0
+
+        return serialized_pages
+
+    def check_query_parameters(self, request, queryset):
+        super(PagesAPIEndpoint, self).check_query_parameters(request, queryset)
+
+        self.get_boolean_parameter(request, 'children_count')
+
+    def can_use_fragment_cache(self, request):
+        # Children counts change without the page itself changing
+        if 'children_count' in request.GET:
+            return False
+
+        return super(PagesAPIEndpoint, self).can_use_fragment_cache(request)
+
+    def get_models(self, request):
+        """
+        This returns the list of page models selected by the "type" query
+        parameter. Multiple types can be separated by commas.
+        Eg: ?type=demo.BlogPage,demo.EventPage
+
+        When more than one type is selected, only fields that are common to
+        all pages can be used.
+        """
         if 'type' not in request.GET:
-            return Page
+            return [Page]
 
-        model_name = request.GET['type']
-        try:
-            return resolve_model_string(model_name)
-        except LookupError:
-            raise self.BadRequestError("type doesn't exist")
+        models = []
+        for model_name in request.GET['type'].split(','):
+            try:
+                model = resolve_model_string(model_name)
+            except LookupError:
+                raise self.BadRequestError("type doesn't exist")
+
+            if not issubclass(model, Page):
+                raise self.BadRequestError("type doesn't exist")
+
+            models.append(model)
+
+        return models
+
+    def get_referenced_fields(self, request):
+        """
+        This returns the names of the fields that the fields, filter, order,
+        expand and include query parameters refer to
+        """
+        field_names = set()
+
+        if 'fields' in request.GET:
+            field_names.update(request.GET['fields'].split(','))
+
+        # Field filters
+        field_names.update(name for name in request.GET.keys() if name not in self.known_query_parameters)
+
+        if 'order' in request.GET and request.GET['order'] != 'random':
+            field_names.add(request.GET['order'].lstrip('-'))
+
+        for param in ('expand', 'include'):
+            if param in request.GET:
+                field_names.update(path.split('.')[0] for path in request.GET[param].split(',') if path)
+
+        return field_names
+
+    def needs_specific_model(self, request, model):
+        """
+        This returns True if the listing has to be queried through the
+        model's own manager (which joins its table onto the page table).
+        This is only needed when the query uses fields that are specific to
+        the model. Searches always need it as search backends filter on the
+        model's index.
+        """
+        if model is Page:
+            return False
+
+        if 'search' in request.GET:
+            return True
+
+        page_fields = set(self.get_api_fields(Page))
+        page_fields.add('id')
+
+        return not self.get_referenced_fields(request).issubset(page_fields)
+
+    def get_page_path(self, request, page_id):
+        """
+        This returns the treebeard path and depth of a page that is visible
+        in the API. These are fetched without loading the page itself.
+        """
+        return self.get_queryset(request).values_list('path', 'depth').get(id=page_id)
 
     def do_child_of_filter(self, request, queryset):
         if 'child_of' in request.GET:
@@ -368,16 +1097,27 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
                 raise self.BadRequestError("child_of must be a positive integer")
 
             try:
-                parent_page = self.get_queryset(request).get(id=parent_page_id)
-                queryset = queryset.child_of(parent_page)
-                queryset._filtered_by_child_of = True
-                return queryset
+                parent_path, parent_depth = self.get_page_path(request, parent_page_id)
             except Page.DoesNotExist:
                 raise self.BadRequestError("parent page doesn't exist")
 
+            queryset = queryset.filter(path__startswith=parent_path, depth=parent_depth + 1)
+            queryset._filtered_by_child_of = True
+            return queryset
+
         return queryset
 
     def do_descendant_of_filter(self, request, queryset):
+        """
+        This filters the result set to pages below a particular page
+        Eg: ?descendant_of=6
+
+        The number of levels below the page can be limited with "depth"
+        Eg: ?descendant_of=6&depth=1 -- Only returns children of page 6
+        """
+        if 'depth' in request.GET and 'descendant_of' not in request.GET:
+            raise self.BadRequestError("depth can only be used with descendant_of")
+
         if 'descendant_of' in request.GET:
             if getattr(queryset, '_filtered_by_child_of', False):
                 raise self.BadRequestError("filtering by descendant_of with child_of is not supported")
@@ -387,24 +1127,49 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
             except (ValueError, AssertionError):
                 raise self.BadRequestError("descendant_of must be a positive integer")
 
+            if 'depth' in request.GET:
+                try:
+                    max_depth = int(request.GET['depth'])
+                    assert max_depth > 0
+                except (ValueError, AssertionError):
+                    raise self.BadRequestError("depth must be a positive integer")
+            else:
+                max_depth = None
+
             try:
-                ancestor_page = self.get_queryset(request).get(id=ancestor_page_id)
-                return queryset.descendant_of(ancestor_page)
+                ancestor_path, ancestor_depth = self.get_page_path(request, ancestor_page_id)
             except Page.DoesNotExist:
                 raise self.BadRequestError("ancestor page doesn't exist")
 
+            queryset = queryset.filter(path__startswith=ancestor_path, depth__gt=ancestor_depth)
+
+            if max_depth is not None:
+                queryset = queryset.filter(depth__lte=ancestor_depth + max_depth)
+
+            return queryset
+
         return queryset
 
     def listing_view(self, request):
-        # Get model and queryset
-        model = self.get_model(request)
-        queryset = self.get_queryset(request, model=model)
+        # Get queryset
+        models = self.get_models(request)
+
+        if len(models) == 1 and self.needs_specific_model(request, models[0]):
+            queryset = self.get_queryset(request, model=models[0])
+        else:
+            # Only fields from the page table are used so the type is
+            # filtered on its content type without joining any other tables
+            queryset = self.get_queryset(request)
+
+            if models != [Page]:
+                queryset = queryset.filter(content_type_id__in=get_page_content_type_ids(models))
 
         # Check query paramters
         self.check_query_parameters(request, queryset)
 
         # Filtering
         queryset = self.do_field_filtering(request, queryset)
+        queryset = self.do_changed_since_filter(request, queryset)
         queryset = self.do_child_of_filter(request, queryset)
         queryset = self.do_descendant_of_filter(request, queryset)
 
@@ -415,8 +1180,7 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
         queryset = self.do_search(request, queryset)
 
         # Pagination
-        total_count = queryset.count()
-        queryset = self.do_pagination(request, queryset)
+        queryset, total_count = self.do_pagination(request, queryset)
 
         # Get list of fields to show in results
         if 'fields' in request.GET:
@@ -424,28 +1188,254 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
         else:
             fields = ('title', )
 
-        return self.json_response(
-            OrderedDict([
-                ('meta', OrderedDict([
-                    ('total_count', total_count),
-                ])),
-                ('pages', [
-                    self.serialize_object(request, page, fields=fields)
-                    for page in queryset
-                ]),
-            ])
-        )
+        return self.listing_response(request, total_count, queryset, fields)
 
     def detail_view(self, request, pk):
+        # Serve the page from its snapshot if there is one. Snapshots are
+        # only of the default representation so requests with query
+        # parameters are always serialised.
+        if getattr(settings, 'WAGTAILAPI_PAGE_SNAPSHOTS', False) and not request.GET:
+            snapshot = self.get_snapshot(request, pk)
+
+            if snapshot is not None:
+                # Snapshots are stored as JSON so must be converted for other formats
+                if not isinstance(get_renderer(request), JSONRenderer):
+                    return self.render_response(request, json.loads(snapshot.data, object_pairs_hook=OrderedDict))
+
+                response = HttpResponse(snapshot.data, content_type='application/json')
+
+                # Allow compressed versions of the snapshot to be cached
+                response.wagtailapi_cache_key = 'wagtailapi:snapshot:%d:%s' % (snapshot.page_id, snapshot.created_at.isoformat())
+
+                return response
+
+        show_ancestors = self.get_boolean_parameter(request, 'ancestors')
+
         page = get_object_or_404(self.get_queryset(request), pk=pk).specific
         data = self.serialize_object(request, page, all_fields=True, show_details=True)
+        self.do_expand(request, [page], [data], self.get_expand_fields(request, type(page)))
+
+        if show_ancestors:
+            data['meta']['ancestors'] = self.get_ancestors(request, page)
+
+        if 'siblings' in request.GET:
+            previous_sibling, next_sibling = self.get_siblings(request, page, request.GET['siblings'])
+            data['meta']['previous_sibling'] = previous_sibling
+            data['meta']['next_sibling'] = next_sibling
+
+        return self.render_response(request, data)
+
+    def serialize_page_link(self, request, page):
+        """
+        This returns the short version of a page used for linking to it
+        from another page (eg, in breadcrumbs)
+        """
+        return OrderedDict([
+            ('id', page.id),
+            ('title', page.title),
+            ('type', get_page_type_name(page.content_type_id)),
+            ('html_url', get_page_html_url(page, get_site_root_paths(request))),
+        ])
+
+    def get_ancestors(self, request, page):
+        """
+        This returns a list of the page's ancestors that are visible in the
+        API, starting from the root page of the site (eg, for breadcrumbs)
+
+        The paths of the ancestors are the prefixes of the page's path so
+        they are all fetched in a single query.
+        """
+        ancestor_paths = [
+            page.path[:length]
+            for length in range(Page.steplen, len(page.path), Page.steplen)
+        ]
+
+        ancestors = self.get_queryset(request).filter(path__in=ancestor_paths).order_by('path')
+
+        return [self.serialize_page_link(request, ancestor) for ancestor in ancestors]
+
+    def get_siblings(self, request, page, order_by):
+        """
+        This returns the visible siblings that come before and after the
+        page (either may be None)
+        Eg: ?siblings=path -- In the order pages are in the tree
+        Eg: ?siblings=-date -- Newest first, by a date field of the page
+
+        When ordering by a date field, only siblings of the same type are
+        used. Siblings with the same date are ordered by their path. Each
+        sibling is fetched with its own single row query.
+        """
+        descending = order_by.startswith('-')
+        field_name = order_by.lstrip('-')
+
+        parent_path = page.path[:-Page.steplen]
+
+        if field_name == 'path':
+            siblings = self.get_queryset(request)
+            value = page.path
+        else:
+            if field_name not in self.get_api_fields(type(page)):
+                raise self.BadRequestError("cannot order siblings by '%s' (must be path or a date field)" % field_name)
+
+            try:
+                field = type(page)._meta.get_field(field_name)
+            except models.fields.FieldDoesNotExist:
+                field = None
+
+            # DateTimeField is a subclass of DateField
+            if not isinstance(field, models.DateField):
+                raise self.BadRequestError("cannot order siblings by '%s' (must be path or a date field)" % field_name)
+
+            siblings = self.get_queryset(request, model=type(page))
+            value = getattr(page, field_name)
+
+            if value is None:
+                return None, None
+
+        siblings = siblings.filter(path__startswith=parent_path, depth=page.depth).exclude(id=page.id)
+
+        before = siblings.filter(
+            models.Q(**{field_name + '__lt': value}) |
+            models.Q(**{field_name: value, 'path__lt': page.path})
+        ).order_by('-' + field_name, '-path').first()
+
+        after = siblings.filter(
+            models.Q(**{field_name + '__gt': value}) |
+            models.Q(**{field_name: value, 'path__gt': page.path})
+        ).order_by(field_name, 'path').first()
+
+        if descending:
+            before, after = after, before
+
+        return (
+            self.serialize_page_link(request, before) if before is not None else None,
+            self.serialize_page_link(request, after) if after is not None else None,
+        )
+
+    def get_snapshot(self, request, pk):
+        """
+        This returns the snapshot of a page if the page is visible in the API
+        """
+        return PageSnapshot.objects.filter(
+            page_id=pk,
+            page__in=self.get_queryset(request).values('pk'),
+        ).first()
+
+    def serialize_snapshot(self, page):
+        """
+        This serialises the detail document of a page for storing in a
+        snapshot. As this happens outside of a request, the page is
+        serialised as if it was requested from the site it belongs to.
+
+        Returns None if the page isn't in a site.
+        """
+        site = get_site_for_page(page)
+        if site is None:
+            return
+
+        request = HttpRequest()
+        request.site = site
+
+        return self.json_encode(self.serialize_object(request, page, all_fields=True, show_details=True))
+
+    def update_snapshot(self, page):
+        """
+        This stores a new snapshot of a page (which must be the specific
+        version of the page)
+        """
+        data = self.serialize_snapshot(page)
+
+        if data is None:
+            PageSnapshot.objects.filter(page_id=page.id).delete()
+        else:
+            PageSnapshot.objects.update_or_create(page_id=page.id, defaults={'data': data})
+
+    def tree_view(self, request, pk):
+        """
+        This returns a page along with all of its visible descendants nested
+        inside each other
+        Eg: /api/v1/pages/2/tree/?depth=3&fields=title
+
+        The whole tree is fetched in a single query ordered by path. As
+        parents always come before their children in this ordering, the
+        nesting can be put together in one pass.
+
+        The depth is limited by the WAGTAILAPI_TREE_DEPTH_MAX setting and
+        the number of pages by WAGTAILAPI_TREE_NODES_MAX. Trees that are
+        larger than this give an error rather than being cut short.
+        """
+        bad_parameters = set(request.GET.keys()) - set(['depth', 'fields'])
+        if bad_parameters:
+            raise self.BadRequestError("query parameter is not an operation or a recognised field: %s" % ', '.join(bad_parameters))
+
+        depth_max = getattr(settings, 'WAGTAILAPI_TREE_DEPTH_MAX', 3)
+        nodes_max = getattr(settings, 'WAGTAILAPI_TREE_NODES_MAX', 500)
+
+        try:
+            depth = int(request.GET.get('depth', min(1, depth_max)))
+
+            if depth > depth_max:
+                raise self.BadRequestError("depth cannot be higher than %d" % depth_max)
+
+            assert depth >= 0
+        except (ValueError, AssertionError):
+            raise self.BadRequestError("depth must be a positive integer")
+
+        # Get list of fields to show in the tree
+        if 'fields' in request.GET:
+            fields = request.GET['fields'].split(',')
+        else:
+            fields = ('title', )
 
-        return self.json_response(data)
+        try:
+            root_path, root_depth = self.get_page_path(request, int(pk))
+        except Page.DoesNotExist:
+            raise Http404("Page not found")
+
+        pages = self.get_queryset(request).filter(
+            path__startswith=root_path,
+            depth__lte=root_depth + depth,
+        ).order_by('path')
+
+        # Fetch one extra page to find out if the tree is too large
+        pages = list(pages[:nodes_max + 1])
+        if len(pages) > nodes_max:
+            raise self.BadRequestError("tree has more than %d pages (use a lower depth)" % nodes_max)
+
+        nodes_by_path = {}
+        for page in pages:
+            node = self.serialize_object(request, page, fields=fields)
+            node['children'] = []
+
+            if page.path != root_path:
+                parent_node = nodes_by_path.get(page.path[:-page.steplen])
+
+                # Skip pages where the parent isn't visible in the API
+                if parent_node is None:
+                    continue
+
+                parent_node['children'].append(node)
+
+            nodes_by_path[page.path] = node
+
+        return self.render_response(request, nodes_by_path[root_path])
+
+    def get_urlpatterns(self):
+        return super(PagesAPIEndpoint, self).get_urlpatterns() + [
+            url(r'^(\d+)/tree/$', self.api_view(self.tree_view), name='tree'),
+        ]
 
 
 class ImagesAPIEndpoint(BaseAPIEndpoint):
+    name = 'images'
+    changed_since_field = 'created_at'
+    records_modifications = True
     model = get_image_model()
 
+    known_query_parameters = BaseAPIEndpoint.known_query_parameters + (
+        'rendition',
+    )
+
     def get_queryset(self, request):
         return self.model.objects.all()
 
@@ -462,6 +1452,7 @@ class ImagesAPIEndpoint(BaseAPIEndpoint):
 
         # Filtering
         queryset = self.do_field_filtering(request, queryset)
+        queryset = self.do_changed_since_filter(request, queryset)
 
         # Ordering
         queryset = self.do_ordering(request, queryset)
@@ -470,8 +1461,7 @@ class ImagesAPIEndpoint(BaseAPIEndpoint):
         queryset = self.do_search(request, queryset)
 
         # Pagination
-        total_count = queryset.count()
-        queryset = self.do_pagination(request, queryset)
+        queryset, total_count = self.do_pagination(request, queryset)
 
         # Get list of fields to show in results
         if 'fields' in request.GET:
@@ -479,31 +1469,175 @@ class ImagesAPIEndpoint(BaseAPIEndpoint):
         else:
             fields = ('title', )
 
-        return self.json_response(
-            OrderedDict([
-                ('meta', OrderedDict([
-                    ('total_count', total_count),
-                ])),
-                ('images', [
-                    self.serialize_object(request, image, fields=fields)
-                    for image in queryset
-                ]),
-            ])
+        return self.listing_response(request, total_count, queryset, fields)
+
+    def serialize_objects(self, request, images, fields=(), all_fields=False, show_details=False):
+        serialized_images = super(ImagesAPIEndpoint, self).serialize_objects(request, images, fields=fields, all_fields=all_fields, show_details=show_details)
+
+        filter_spec = self.get_rendition_filter_spec(request)
+        if filter_spec is not None:
+            renditions = self.get_renditions(request, images, filter_spec)
+
+            for image, data in zip(images, serialized_images):
+                data['rendition'] = renditions.get(image.pk)
+
+        return serialized_images
+
+    def get_rendition_cache_key(self, image_id, version, filter_spec):
+        return 'wagtailapi:rendition:%d:%s:%s' % (image_id, version, filter_spec)
+
+    def get_renditions(self, request, images, filter_spec):
+        """
+        This returns a dict of the url, width and height of a rendition of
+        each of the images
+
+        Renditions are looked up in the API cache first and then in the
+        database with a single query. Up to WAGTAILAPI_RENDITION_GENERATE_MAX
+        missing renditions are generated. The rest are given the URL of the
+        rendition view, which generates them when they are first requested.
+        """
+        images = list(images)
+        if not images:
+            return {}
+
+        renditions = {}
+        cache = get_api_cache()
+
+        # Look in the API cache. The keys include the image's version so
+        # that they expire when the image is changed
+        if cache is not None:
+            versions = get_object_versions(self.name, [image.pk for image in images])
+            cache_keys = dict(
+                (image.pk, self.get_rendition_cache_key(image.pk, versions[image.pk], filter_spec))
+                for image in images
+            )
+            cached_renditions = cache.get_many(cache_keys.values())
+
+            for image in images:
+                if cache_keys[image.pk] in cached_renditions:
+                    renditions[image.pk] = cached_renditions[cache_keys[image.pk]]
+
+        missing_images = [image for image in images if image.pk not in renditions]
+        if not missing_images:
+            return renditions
+
+        # Look in the database
+        image_filter, created = Filter.objects.get_or_create(spec=filter_spec)
+        rendition_model = missing_images[0].renditions.model
+        existing_renditions = dict(
+            ((rendition.image_id, rendition.focal_point_key), rendition)
+            for rendition in rendition_model.objects.filter(image__in=missing_images, filter=image_filter)
         )
 
+        generate_max = getattr(settings, 'WAGTAILAPI_RENDITION_GENERATE_MAX', 10)
+        generated = 0
+        new_renditions = {}
+        for image in missing_images:
+            rendition = existing_renditions.get((image.pk, image_filter.get_vary_key(image)))
+
+            if rendition is None and generated < generate_max:
+                generated += 1
+
+                try:
+                    rendition = image.get_rendition(image_filter)
+                except IOError:
+                    # The original image file is missing
+                    renditions[image.pk] = None
+                    continue
+
+            if rendition is None:
+                renditions[image.pk] = OrderedDict([
+                    ('url', self.get_full_url(request, reverse('wagtailapi_v1_images:rendition', args=(image.pk, filter_spec)))),
+                ])
+                continue
+
+            url = rendition.url
+            if url.startswith('/'):
+                url = self.get_full_url(request, url)
+
+            renditions[image.pk] = OrderedDict([
+                ('url', url),
+                ('width', rendition.width),
+                ('height', rendition.height),
+            ])
+
+            if cache is not None:
+                new_renditions[cache_keys[image.pk]] = renditions[image.pk]
+
+        if new_renditions:
+            cache.set_many(new_renditions)
+
+        return renditions
+
     def detail_view(self, request, pk):
         image = get_object_or_404(self.get_queryset(request), pk=pk)
-        data = self.serialize_object(request, image, all_fields=True)
+        data = self.serialize_objects(request, [image], all_fields=True)[0]
+        self.do_expand(request, [image], [data], self.get_expand_fields(request, type(image)))
+
+        return self.render_response(request, data)
+
+    def rendition_view(self, request, pk, filter_spec):
+        """
+        This generates a rendition of an image (if it doesn't exist yet)
+        and redirects to it. Listings link to this for renditions that they
+        didn't have time to generate.
+        """
+        image = get_object_or_404(self.get_queryset(request), pk=pk)
+        filter_spec = self.check_rendition_filter_spec(filter_spec)
 
-        return self.json_response(data)
+        try:
+            rendition = image.get_rendition(filter_spec)
+        except IOError:
+            raise Http404("Image file not found")
+
+        return HttpResponseRedirect(rendition.url)
+
+    def get_urlpatterns(self):
+        return super(ImagesAPIEndpoint, self).get_urlpatterns() + [
+            url(r'^(\d+)/renditions/([^/]+)/$', self.api_view(self.rendition_view), name='rendition'),
+        ]
 
 
 class DocumentsAPIEndpoint(BaseAPIEndpoint):
+    name = 'documents'
+    changed_since_field = 'created_at'
+    records_modifications = True
+
+    # These are stored in the DocumentMetadata model when documents are saved
+    metadata_fields = ('file_size', 'content_type', 'checksum')
+
+    def get_queryset(self, request):
+        return Document.objects.select_related('api_metadata')
+
     def get_api_fields(self, model):
         api_fields = ['title', 'tags']
+        api_fields.extend(self.metadata_fields)
         api_fields.extend(super(DocumentsAPIEndpoint, self).get_api_fields(model))
         return api_fields
 
+    def get_field_lookup(self, field_name):
+        if field_name in self.metadata_fields:
+            return 'api_metadata__' + field_name
+
+        return super(DocumentsAPIEndpoint, self).get_field_lookup(field_name)
+
+    def get_api_data(self, document, fields):
+        """
+        The metadata fields are read from the document's DocumentMetadata,
+        which get_queryset loads in the same query as the document
+        """
+        try:
+            document_metadata = document.api_metadata
+        except DocumentMetadata.DoesNotExist:
+            document_metadata = None
+
+        for field in fields:
+            if field in self.metadata_fields:
+                yield field, getattr(document_metadata, field) if document_metadata is not None else None
+            else:
+                for item in super(DocumentsAPIEndpoint, self).get_api_data(document, [field]):
+                    yield item
+
     def serialize_object_metadata(self, request, document, show_details=False):
         data = super(DocumentsAPIEndpoint, self).serialize_object_metadata(request, document, show_details=show_details)
 
@@ -514,13 +1648,14 @@ class DocumentsAPIEndpoint(BaseAPIEndpoint):
         return data
 
     def listing_view(self, request):
-        queryset = Document.objects.all()
+        queryset = self.get_queryset(request)
 
         # Check query paramters
         self.check_query_parameters(request, queryset)
 
         # Filtering
         queryset = self.do_field_filtering(request, queryset)
+        queryset = self.do_changed_since_filter(request, queryset)
 
         # Ordering
         queryset = self.do_ordering(request, queryset)
@@ -529,8 +1664,7 @@ class DocumentsAPIEndpoint(BaseAPIEndpoint):
         queryset = self.do_search(request, queryset)
 
         # Pagination
-        total_count = queryset.count()
-        queryset = self.do_pagination(request, queryset)
+        queryset, total_count = self.do_pagination(request, queryset)
 
         # Get list of fields to show in results
         if 'fields' in request.GET:
@@ -538,20 +1672,145 @@ class DocumentsAPIEndpoint(BaseAPIEndpoint):
         else:
             fields = ('title', )
 
-        return self.json_response(
-            OrderedDict([
-                ('meta', OrderedDict([
-                    ('total_count', total_count),
-                ])),
-                ('documents', [
-                    self.serialize_object(request, document, fields=fields)
-                    for document in queryset
-                ]),
-            ])
-        )
+        return self.listing_response(request, total_count, queryset, fields)
 
     def detail_view(self, request, pk):
-        document = get_object_or_404(Document, pk=pk)
+        document = get_object_or_404(self.get_queryset(request), pk=pk)
         data = self.serialize_object(request, document, all_fields=True, show_details=True)
+        self.do_expand(request, [document], [data], self.get_expand_fields(request, type(document)))
 
-        return self.json_response(data)
+        return self.render_response(request, data)
+
+
+class ChangesAPIEndpoint(BaseAPIEndpoint):
+    """
+    Streams change events to clients as server-sent events so that they
+    don't need to poll the other endpoints to find out what has changed.
+    """
+    name = 'changes'
+
+    known_query_parameters = (
+        'last_event_id',
+    )
+
+    # A comment is sent after this many seconds without events so that
+    # proxies don't close idle connections
+    keepalive_interval = 15
+
+    # Tells clients how long to wait before reconnecting (in milliseconds)
+    retry_interval = 5000
+
+    def get_last_event_id(self, request, broker):
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID', request.GET.get('last_event_id'))
+
+        # Without an event id, start from the latest event
+        if last_event_id is None:
+            return broker.get_last_event_id()
+
+        try:
+            last_event_id = int(last_event_id)
+            assert last_event_id >= 0
+        except (ValueError, AssertionError):
+            raise self.BadRequestError("last_event_id must be a positive integer")
+
+        return last_event_id
+
+    def get_stream_duration(self):
+        """
+        Returns the number of seconds to keep streams open for (or None to
+        keep them open until the client disconnects). Streams are closed
+        so that server workers aren't held forever. Clients reconnect and
+        resume with "Last-Event-ID".
+        """
+        return getattr(settings, 'WAGTAILAPI_CHANGES_STREAM_DURATION', 300)
+
+    def filter_events(self, request, events):
+        """
+        Removes events for pages that aren't visible through the pages
+        endpoint (such as pages in private sections)
+
+        Unpublished pages aren't live any more, so events for them are
+        checked with the same rules apart from that.
+        """
+        page_ids = [event.object_id for event in events if event.endpoint == 'pages']
+
+        if not page_ids:
+            return events
+
+        live_by_page_id = dict(
+            PagesAPIEndpoint().get_public_queryset(request).filter(id__in=page_ids).values_list('id', 'live')
+        )
+
+        def is_visible(event):
+            if event.endpoint != 'pages':
+                return True
+
+            if event.object_id not in live_by_page_id:
+                return False
+
+            return event.action != 'published' or live_by_page_id[event.object_id]
+
+        return [event for event in events if is_visible(event)]
+
+    def serialize_event(self, event):
+        data = OrderedDict([
+            ('endpoint', event.endpoint),
+            ('id', event.object_id),
+            ('action', event.action),
+        ])
+
+        return 'id: %d\nevent: %s\ndata: %s\n\n' % (event.id, event.action, json.dumps(data))
+
+    def stream_events(self, request, broker, last_event_id):
+        yield 'retry: %d\n\n' % self.retry_interval
+
+        stream_duration = self.get_stream_duration()
+        deadline = time.time() + stream_duration if stream_duration is not None else None
+
+        while True:
+            if deadline is not None:
+                timeout = max(min(self.keepalive_interval, deadline - time.time()), 0)
+            else:
+                timeout = self.keepalive_interval
+
+            events = broker.get_events(last_event_id, timeout)
+
+            if events:
+                last_event_id = events[-1].id
+
+            for event in self.filter_events(request, events):
+                yield self.serialize_event(event)
+
+            if deadline is not None and time.time() >= deadline:
+                break
+
+            if not events:
+                yield ': keepalive\n\n'
+
+    def listing_view(self, request):
+        broker = get_change_broker()
+        if broker is None:
+            raise Http404("the change feed is not enabled")
+
+        # Check query paramters
+        bad_parameters = set(request.GET.keys()) - set(self.known_query_parameters)
+        if bad_parameters:
+            raise self.BadRequestError("query parameter is not an operation or a recognised field: %s" % ', '.join(bad_parameters))
+
+        last_event_id = self.get_last_event_id(request, broker)
+
+        response = StreamingHttpResponse(
+            self.stream_events(request, broker, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+    def get_urlpatterns(self):
+        return [
+            url(r'^$', self.api_view(self.listing_view), name='listing'),
+        ]
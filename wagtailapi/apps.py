@@ -1,4 +1,5 @@
 from django.apps import AppConfig, apps
+from django.conf import settings
 
 
 class WagtailAPIAppConfig(AppConfig):
@@ -7,8 +8,36 @@ class WagtailAPIAppConfig(AppConfig):
     verbose_name = "Wagtail API"
 
     def ready(self):
+        # Record edited and removed objects for clients that sync with "changed_since"
+        from wagtailapi.signal_handlers import register_tombstone_signal_handlers
+
+        register_tombstone_signal_handlers()
+
+        # Store the size, type and checksum of document files when they are saved
+        from wagtailapi.signal_handlers import register_document_metadata_signal_handlers
+
+        register_document_metadata_signal_handlers()
+
         # Install cache purging signal handlers if frontendcache is installed
         if apps.is_installed('wagtail.contrib.wagtailfrontendcache'):
             from wagtailapi.signal_handlers import register_signal_handlers
 
             register_signal_handlers()
+
+        # Keep page snapshots up to date if they are enabled
+        if getattr(settings, 'WAGTAILAPI_PAGE_SNAPSHOTS', False):
+            from wagtailapi.signal_handlers import register_snapshot_signal_handlers
+
+            register_snapshot_signal_handlers()
+
+        # Expire cached objects when they change if the API cache is enabled
+        if getattr(settings, 'WAGTAILAPI_CACHE', None):
+            from wagtailapi.signal_handlers import register_fragment_cache_signal_handlers
+
+            register_fragment_cache_signal_handlers()
+
+        # Publish change events if the change feed is enabled
+        if getattr(settings, 'WAGTAILAPI_CHANGES_BROKER', None):
+            from wagtailapi.signal_handlers import register_change_feed_signal_handlers
+
+            register_change_feed_signal_handlers()
@@ -0,0 +1,126 @@
+import time
+import threading
+from collections import namedtuple, deque
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils.module_loading import import_string
+
+
+Event = namedtuple('Event', ['id', 'endpoint', 'object_id', 'action'])
+
+
+class BaseBroker(object):
+    """
+    Brokers pass change events from the signal handlers to the change feed.
+
+    Events must be given increasing integer ids so that clients can resume
+    the feed from the last event they received.
+    """
+    def publish(self, endpoint, object_id, action):
+        raise NotImplementedError
+
+    def get_last_event_id(self):
+        raise NotImplementedError
+
+    def get_events(self, after_id, timeout):
+        """
+        Returns the events after the given event id. If there aren't any
+        yet, this waits up to "timeout" seconds for some to be published.
+        """
+        raise NotImplementedError
+
+
+class DatabaseBroker(BaseBroker):
+    """
+    Stores events in the ChangeEvent table and polls it for new ones. This
+    works across processes and servers without any extra services.
+    """
+    poll_interval = 1
+    batch_size = 100
+
+    def publish(self, endpoint, object_id, action):
+        from .models import ChangeEvent
+        from .utils import get_sync_window_start
+
+        ChangeEvent.objects.create(endpoint=endpoint, object_id=object_id, action=action)
+
+        # Forget about events from before clients can sync from
+        ChangeEvent.objects.filter(created_at__lt=get_sync_window_start()).delete()
+
+    def get_last_event_id(self):
+        from .models import ChangeEvent
+
+        return ChangeEvent.objects.aggregate(Max('id'))['id__max'] or 0
+
+    def get_events(self, after_id, timeout):
+        from .models import ChangeEvent
+
+        deadline = time.time() + timeout
+
+        while True:
+            events = list(ChangeEvent.objects.filter(id__gt=after_id).order_by('id')[:self.batch_size])
+
+            remaining = deadline - time.time()
+            if events or remaining <= 0:
+                return events
+
+            time.sleep(min(self.poll_interval, remaining))
+
+
+class InProcessBroker(BaseBroker):
+    """
+    Keeps the most recent events in memory. Clients only receive events
+    that were published in the same process, so this is only suitable for
+    development and single process servers.
+    """
+    max_events = 1000
+
+    def __init__(self):
+        self.events = deque(maxlen=self.max_events)
+        self.last_event_id = 0
+        self.condition = threading.Condition()
+
+    def publish(self, endpoint, object_id, action):
+        with self.condition:
+            self.last_event_id += 1
+            self.events.append(Event(self.last_event_id, endpoint, object_id, action))
+            self.condition.notify_all()
+
+    def get_last_event_id(self):
+        return self.last_event_id
+
+    def get_pending_events(self, after_id):
+        # Ids restart from 1 when the process restarts. Clients that have
+        # seen a higher id must be sent everything we have
+        if after_id > self.last_event_id:
+            after_id = 0
+
+        return [event for event in self.events if event.id > after_id]
+
+    def get_events(self, after_id, timeout):
+        with self.condition:
+            events = self.get_pending_events(after_id)
+
+            if not events and timeout > 0:
+                self.condition.wait(timeout)
+                events = self.get_pending_events(after_id)
+
+            return events
+
+
+_brokers = {}
+
+
+def get_change_broker():
+    """
+    Returns the broker set in WAGTAILAPI_CHANGES_BROKER (or None if the
+    change feed is disabled)
+    """
+    broker_path = getattr(settings, 'WAGTAILAPI_CHANGES_BROKER', None)
+
+    if broker_path:
+        if broker_path not in _brokers:
+            _brokers[broker_path] = import_string(broker_path)()
+
+        return _brokers[broker_path]
@@ -0,0 +1,105 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.http import HttpRequest
+from django.test.utils import CaptureQueriesContext
+
+from wagtail.wagtailcore.models import Site
+from wagtail.wagtailsearch.backends import get_search_backend
+
+from wagtailapi.api import PagesAPIEndpoint, ImagesAPIEndpoint, DocumentsAPIEndpoint
+from wagtailapi.utils import get_queryset_window
+
+
+ENDPOINTS = {
+    'pages': PagesAPIEndpoint,
+    'images': ImagesAPIEndpoint,
+    'documents': DocumentsAPIEndpoint,
+}
+
+
+def get_counted_window(queryset, start, stop):
+    # The way listings were paginated before the count was fetched with the window
+    return list(queryset[start:stop]), queryset.count()
+
+
+class Command(BaseCommand):
+    help = "Compares fetching a page of results and the total count in one query against counting separately"
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--endpoint',
+            dest='endpoint',
+            default='pages',
+            help="The endpoint to paginate (pages, images or documents)",
+        ),
+        make_option(
+            '--search',
+            dest='search',
+            default=None,
+            help="Paginate the results of this search query (with the database search backend)",
+        ),
+        make_option(
+            '--limit',
+            dest='limit',
+            type='int',
+            default=20,
+            help="The number of results on each page",
+        ),
+        make_option(
+            '--offset',
+            dest='offset',
+            type='int',
+            default=0,
+            help="The index of the first result",
+        ),
+        make_option(
+            '--repeat',
+            dest='repeat',
+            type='int',
+            default=20,
+            help="The number of times to fetch the page",
+        ),
+    )
+
+    def handle(self, **options):
+        if options['endpoint'] not in ENDPOINTS:
+            raise CommandError("Unknown endpoint: %s" % options['endpoint'])
+
+        endpoint = ENDPOINTS[options['endpoint']]()
+
+        request = HttpRequest()
+        request.site = Site.objects.get(is_default_site=True)
+
+        queryset = endpoint.get_queryset(request).order_by('id')
+
+        if options['search'] is not None:
+            queryset = get_search_backend().search(options['search'], queryset)
+
+            if not isinstance(queryset, QuerySet):
+                raise CommandError("Only the database search backend returns results that can be counted in the same query")
+
+        start = options['offset']
+        stop = options['offset'] + options['limit']
+
+        self.stdout.write("%s from %d to %d, fetched %d times\n" % (endpoint.name, start, stop, options['repeat']))
+        self.stdout.write("%-20s %10s %12s %12s" % ("Method", "Queries", "Total count", "Time (ms)"))
+
+        for name, get_window in (('separate count', get_counted_window), ('windowed count', get_queryset_window)):
+            with CaptureQueriesContext(connection) as queries:
+                window, total_count = get_window(queryset, start, stop)
+
+            start_time = time.time()
+            for i in range(options['repeat']):
+                get_window(queryset, start, stop)
+            fetch_time = (time.time() - start_time) * 1000 / options['repeat']
+
+            self.stdout.write("%-20s %10d %12d %12.2f" % (
+                name,
+                len(queries),
+                total_count,
+                fetch_time,
+            ))
@@ -0,0 +1,89 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest
+from django.utils.text import compress_string
+
+from wagtail.wagtailcore.models import Site
+
+from wagtailapi.api import PagesAPIEndpoint, ImagesAPIEndpoint, DocumentsAPIEndpoint
+from wagtailapi.renderers import get_renderers
+
+
+ENDPOINTS = {
+    'pages': PagesAPIEndpoint,
+    'images': ImagesAPIEndpoint,
+    'documents': DocumentsAPIEndpoint,
+}
+
+
+class Command(BaseCommand):
+    help = "Compares the size and speed of the formats that the API can respond in"
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--endpoint',
+            dest='endpoint',
+            default='pages',
+            help="The endpoint to serialise objects from (pages, images or documents)",
+        ),
+        make_option(
+            '--limit',
+            dest='limit',
+            type='int',
+            default=100,
+            help="The number of objects to put in the listing",
+        ),
+        make_option(
+            '--repeat',
+            dest='repeat',
+            type='int',
+            default=20,
+            help="The number of times to encode and decode the listing",
+        ),
+    )
+
+    def handle(self, **options):
+        if options['endpoint'] not in ENDPOINTS:
+            raise CommandError("Unknown endpoint: %s" % options['endpoint'])
+
+        endpoint = ENDPOINTS[options['endpoint']]()
+
+        request = HttpRequest()
+        request.site = Site.objects.get(is_default_site=True)
+
+        # Build a listing of objects with all of their fields
+        objects = endpoint.get_queryset(request).order_by('id')[:options['limit']]
+        data = {
+            'meta': {'total_count': len(objects)},
+            endpoint.name: [
+                endpoint.serialize_object(request, getattr(obj, 'specific', obj), all_fields=True)
+                for obj in objects
+            ],
+        }
+
+        self.stdout.write("%d %s, encoded and decoded %d times\n" % (len(objects), endpoint.name, options['repeat']))
+        self.stdout.write("%-20s %10s %10s %12s %12s" % ("Format", "Size", "Gzipped", "Encode (ms)", "Decode (ms)"))
+
+        for renderer in get_renderers():
+            start = time.time()
+            for i in range(options['repeat']):
+                content = renderer.render(data)
+            encode_time = (time.time() - start) * 1000 / options['repeat']
+
+            if not isinstance(content, bytes):
+                content = content.encode('UTF-8')
+
+            start = time.time()
+            for i in range(options['repeat']):
+                renderer.parse(content)
+            decode_time = (time.time() - start) * 1000 / options['repeat']
+
+            self.stdout.write("%-20s %10d %10d %12.2f %12.2f" % (
+                renderer.media_type,
+                len(content),
+                len(compress_string(content)),
+                encode_time,
+                decode_time,
+            ))
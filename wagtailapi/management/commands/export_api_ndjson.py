@@ -0,0 +1,238 @@
+import os
+import shutil
+import multiprocessing
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Min, Max
+from django.http import HttpRequest
+
+from wagtail.wagtailcore.models import Site, PAGE_MODEL_CLASSES
+
+from wagtailapi.api import PagesAPIEndpoint, ImagesAPIEndpoint, DocumentsAPIEndpoint
+from wagtailapi.renderers import WagtailAPIJSONEncoder
+
+
+ENDPOINTS = {
+    'pages': PagesAPIEndpoint,
+    'images': ImagesAPIEndpoint,
+    'documents': DocumentsAPIEndpoint,
+}
+
+
+def get_request(site_id):
+    request = HttpRequest()
+    request.site = Site.objects.get(id=site_id)
+    return request
+
+
+def get_specific_pages(pages):
+    """
+    Converts a list of pages into their specific versions, using one query
+    for each page type rather than one query for each page
+    """
+    ids_by_model = {}
+    for page in pages:
+        ids_by_model.setdefault(page.specific_class, []).append(page.id)
+
+    specific_pages = {}
+    for model, ids in ids_by_model.items():
+        specific_pages.update(model.objects.in_bulk(ids))
+
+    return [specific_pages[page.id] for page in pages if page.id in specific_pages]
+
+
+def iter_chunks(queryset, chunk_size, start_id=None, stop_id=None):
+    """
+    Yields lists of objects from the queryset in id order
+
+    Each chunk is fetched with a separate query that carries on from the
+    last id of the previous chunk, so memory use doesn't grow with the
+    size of the table and rows aren't skipped if earlier rows are deleted.
+    """
+    if start_id is not None:
+        queryset = queryset.filter(id__gte=start_id)
+    if stop_id is not None:
+        queryset = queryset.filter(id__lt=stop_id)
+
+    last_id = None
+    while True:
+        chunk_queryset = queryset.order_by('id')
+        if last_id is not None:
+            chunk_queryset = chunk_queryset.filter(id__gt=last_id)
+
+        chunk = list(chunk_queryset[:chunk_size].iterator())
+        if not chunk:
+            return
+
+        last_id = chunk[-1].id
+        yield chunk
+
+
+def export_objects(endpoint_name, site_id, fields, chunk_size, output, start_id=None, stop_id=None):
+    """
+    Writes each object in the endpoint to output as a line of JSON. Returns
+    the number of objects that were written.
+    """
+    endpoint = ENDPOINTS[endpoint_name]()
+    request = get_request(site_id)
+    encoder = WagtailAPIJSONEncoder()
+    count = 0
+
+    for chunk in iter_chunks(endpoint.get_queryset(request), chunk_size, start_id=start_id, stop_id=stop_id):
+        if endpoint_name == 'pages':
+            chunk = get_specific_pages(chunk)
+
+        for obj in chunk:
+            if fields:
+                # Pages of different types have different fields so only the
+                # requested fields that this object has are exported
+                api_fields = endpoint.get_api_fields(type(obj))
+                object_fields = [field for field in fields if field in api_fields]
+
+                data = endpoint.serialize_object(request, obj, fields=object_fields, show_details=True)
+            else:
+                data = endpoint.serialize_object(request, obj, all_fields=True, show_details=True)
+
+            output.write(encoder.encode(data) + '\n')
+            count += 1
+
+    return count
+
+
+def export_part(args):
+    # Runs in a worker process
+    endpoint_name, site_id, fields, chunk_size, path, start_id, stop_id = args
+
+    with open(path, 'w') as output:
+        return export_objects(endpoint_name, site_id, fields, chunk_size, output, start_id=start_id, stop_id=stop_id)
+
+
+class Command(BaseCommand):
+    help = "Exports every object in an API endpoint as newline delimited JSON"
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--endpoint',
+            dest='endpoint',
+            default='pages',
+            help="The endpoint to export (pages, images or documents)",
+        ),
+        make_option(
+            '--fields',
+            dest='fields',
+            default=None,
+            help="A comma separated list of fields to export (default: all fields)",
+        ),
+        make_option(
+            '--site',
+            dest='site',
+            type='int',
+            default=None,
+            help="The id of the site to export from (default: the default site)",
+        ),
+        make_option(
+            '--output',
+            dest='output',
+            default=None,
+            help="The file to write to (default: standard output)",
+        ),
+        make_option(
+            '--chunk-size',
+            dest='chunk_size',
+            type='int',
+            default=1000,
+            help="The number of objects to fetch from the database at a time",
+        ),
+        make_option(
+            '--workers',
+            dest='workers',
+            type='int',
+            default=1,
+            help="The number of processes to export with. Each process exports a range of ids to its own part file",
+        ),
+    )
+
+    def handle(self, **options):
+        endpoint_name = options['endpoint']
+        if endpoint_name not in ENDPOINTS:
+            raise CommandError("Unknown endpoint: %s" % endpoint_name)
+
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be a positive integer")
+
+        if options['workers'] < 1:
+            raise CommandError("--workers must be a positive integer")
+
+        if options['workers'] > 1 and not options['output']:
+            raise CommandError("--output must be set when using more than one worker")
+
+        if options['site'] is None:
+            site_id = Site.objects.get(is_default_site=True).id
+        else:
+            site_id = options['site']
+
+        fields = options['fields'].split(',') if options['fields'] else None
+
+        # Check the fields before starting (rather than failing part way through)
+        endpoint = ENDPOINTS[endpoint_name]()
+        if fields:
+            if endpoint_name == 'pages':
+                models = PAGE_MODEL_CLASSES
+            else:
+                models = [endpoint.get_queryset(get_request(site_id)).model]
+
+            known_fields = set(field for model in models for field in endpoint.get_api_fields(model))
+            bad_fields = [field for field in fields if field not in known_fields]
+            if bad_fields:
+                raise CommandError("Unknown fields: %s" % ', '.join(bad_fields))
+
+        if options['workers'] > 1:
+            count = self.export_parallel(endpoint_name, site_id, fields, options['chunk_size'], options['output'], options['workers'])
+        elif options['output']:
+            with open(options['output'], 'w') as output:
+                count = export_objects(endpoint_name, site_id, fields, options['chunk_size'], output)
+        else:
+            count = export_objects(endpoint_name, site_id, fields, options['chunk_size'], self.stdout)
+
+        # Don't mix the summary into the export when writing to standard output
+        self.stderr.write("Exported %d %s" % (count, endpoint_name))
+
+    def export_parallel(self, endpoint_name, site_id, fields, chunk_size, path, workers):
+        """
+        Splits the range of ids into one part for each worker. The parts are
+        exported to separate files in parallel and joined together in id
+        order once they are all finished.
+        """
+        endpoint = ENDPOINTS[endpoint_name]()
+        id_range = endpoint.get_queryset(get_request(site_id)).aggregate(min_id=Min('id'), max_id=Max('id'))
+
+        if id_range['min_id'] is None:
+            open(path, 'w').close()
+            return 0
+
+        step = (id_range['max_id'] - id_range['min_id']) // workers + 1
+        parts = [
+            (endpoint_name, site_id, fields, chunk_size, '%s.part%d' % (path, i), id_range['min_id'] + i * step, id_range['min_id'] + (i + 1) * step)
+            for i in range(workers)
+        ]
+
+        # Worker processes must not share the database connection
+        connection.close()
+
+        pool = multiprocessing.Pool(workers)
+        try:
+            counts = pool.map(export_part, parts)
+        finally:
+            pool.close()
+            pool.join()
+
+        with open(path, 'w') as output:
+            for part in parts:
+                with open(part[4]) as part_file:
+                    shutil.copyfileobj(part_file, output)
+
+                os.remove(part[4])
+
+        return sum(counts)
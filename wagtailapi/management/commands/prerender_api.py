@@ -0,0 +1,249 @@
+import os
+import json
+from optparse import make_option
+
+from six.moves.urllib.parse import urlparse, quote
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse, resolve
+from django.test import RequestFactory
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from wagtail.wagtailcore.models import Site
+
+from wagtailapi.api import PagesAPIEndpoint, ImagesAPIEndpoint, DocumentsAPIEndpoint
+from wagtailapi.brokers import DatabaseBroker, get_change_broker
+from wagtailapi.models import ChangeEvent
+from wagtailapi.utils import get_sync_retention_days, get_sync_window_start
+
+
+ENDPOINTS = (
+    PagesAPIEndpoint,
+    ImagesAPIEndpoint,
+    DocumentsAPIEndpoint,
+)
+
+
+# Stores which URLs have been written to which files and how far through
+# the change feed the last build got
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def get_detail_url(endpoint_name, pk):
+    return reverse('wagtailapi_v1_%s:detail' % endpoint_name, args=(pk, ))
+
+
+def get_listing_urls():
+    """
+    Returns the listing URLs to prerender. These can be changed with the
+    WAGTAILAPI_PRERENDER_LISTINGS setting.
+    """
+    listing_urls = getattr(settings, 'WAGTAILAPI_PRERENDER_LISTINGS', None)
+
+    if listing_urls is None:
+        listing_urls = [
+            reverse('wagtailapi_v1_%s:listing' % endpoint.name)
+            for endpoint in ENDPOINTS
+        ]
+
+    return listing_urls
+
+
+def get_file_path(url):
+    """
+    Works out the file that a URL is stored in relative to the output
+    directory
+
+    The response of /api/v1/pages/16/ is stored in api/v1/pages/16/index.json.
+    URLs with query strings are stored next to that, with the query string
+    in the file name.
+    """
+    url = urlparse(url)
+    path = url.path.strip('/')
+
+    if url.query:
+        filename = 'index.%s.json' % quote(url.query, safe='')
+    else:
+        filename = 'index.json'
+
+    return os.path.join(path, filename)
+
+
+class Command(BaseCommand):
+    help = "Renders API responses to a directory of static JSON files"
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--output-dir',
+            dest='output_dir',
+            default=None,
+            help="The directory to write the files to",
+        ),
+        make_option(
+            '--site',
+            dest='site',
+            type='int',
+            default=None,
+            help="The id of the site to render pages from (default: the default site)",
+        ),
+        make_option(
+            '--incremental',
+            action='store_true',
+            dest='incremental',
+            default=False,
+            help="Only render objects that have changed since the last build (requires the DatabaseBroker)",
+        ),
+    )
+
+    def handle(self, **options):
+        if not options['output_dir']:
+            raise CommandError("--output-dir must be set")
+
+        self.output_dir = options['output_dir']
+
+        if options['site'] is None:
+            self.site = Site.objects.get(is_default_site=True)
+        else:
+            self.site = Site.objects.get(id=options['site'])
+
+        self.request_factory = RequestFactory()
+
+        broker = get_change_broker()
+        if not isinstance(broker, DatabaseBroker):
+            broker = None
+
+        manifest = self.read_manifest()
+
+        if options['incremental']:
+            if broker is None:
+                raise CommandError("--incremental requires WAGTAILAPI_CHANGES_BROKER to be set to 'wagtailapi.brokers.DatabaseBroker'")
+
+            if manifest is None or manifest.get('last_event_id') is None:
+                raise CommandError("--incremental requires a previous full build")
+
+            # Change events are removed after the retention period
+            built_at = parse_datetime(manifest.get('built_at') or '')
+            if built_at is None or built_at < get_sync_window_start():
+                raise CommandError("--incremental requires a previous build from the last %d days" % get_sync_retention_days())
+
+        # Take the latest event id before rendering so anything that
+        # changes during the build is rendered again next time
+        last_event_id = broker.get_last_event_id() if broker is not None else None
+        built_at = timezone.now()
+
+        if options['incremental']:
+            files = manifest['files']
+            changed, removed = self.get_changes(manifest['last_event_id'])
+        else:
+            files = {}
+            changed = [
+                (endpoint.name, pk)
+                for endpoint in ENDPOINTS
+                for pk in endpoint().get_queryset(self.get_request('/')).values_list('pk', flat=True)
+            ]
+            removed = []
+
+        # Detail views
+        rendered = 0
+        for endpoint_name, pk in changed:
+            url = get_detail_url(endpoint_name, pk)
+
+            if self.render(url):
+                files[url] = get_file_path(url)
+                rendered += 1
+            else:
+                # It's not visible in the API any more
+                removed.append((endpoint_name, pk))
+
+        deleted = 0
+        for endpoint_name, pk in removed:
+            url = get_detail_url(endpoint_name, pk)
+
+            if url in files:
+                self.delete(files.pop(url))
+                deleted += 1
+
+        # Listings change whenever anything in them changes so are always rendered
+        for url in get_listing_urls():
+            if self.render(url):
+                files[url] = get_file_path(url)
+                rendered += 1
+
+        # Remove files from the previous full build that weren't rendered this time
+        if not options['incremental'] and manifest is not None:
+            for url, file_path in manifest['files'].items():
+                if url not in files:
+                    self.delete(file_path)
+                    deleted += 1
+
+        self.write_manifest({
+            'last_event_id': last_event_id,
+            'built_at': built_at.isoformat(),
+            'files': files,
+        })
+
+        self.stdout.write("%d files rendered, %d deleted" % (rendered, deleted))
+
+    def get_changes(self, last_event_id):
+        """
+        Returns lists of objects to render and delete from the change events
+        since the last build
+        """
+        actions = {}
+        for event in ChangeEvent.objects.filter(id__gt=last_event_id).order_by('id').iterator():
+            # Only the last thing that happened to each object matters
+            actions[(event.endpoint, event.object_id)] = event.action
+
+        changed = [key for key, action in sorted(actions.items()) if action in ('published', 'saved')]
+        removed = [key for key, action in sorted(actions.items()) if action in ('unpublished', 'deleted')]
+
+        return changed, removed
+
+    def get_request(self, url):
+        request = self.request_factory.get(url)
+        request.site = self.site
+        return request
+
+    def render(self, url):
+        """
+        Renders the URL to its file. Returns False if the URL didn't give a
+        successful response.
+        """
+        match = resolve(urlparse(url).path)
+        response = match.func(self.get_request(url), *match.args, **match.kwargs)
+
+        if response.status_code != 200:
+            return False
+
+        path = os.path.join(self.output_dir, get_file_path(url))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        # Write to a temporary file first so that the file is never seen half written
+        with open(path + '.tmp', 'wb') as f:
+            f.write(response.content)
+        os.rename(path + '.tmp', path)
+
+        return True
+
+    def delete(self, file_path):
+        path = os.path.join(self.output_dir, file_path)
+
+        if os.path.exists(path):
+            os.remove(path)
+
+    def read_manifest(self):
+        path = os.path.join(self.output_dir, MANIFEST_FILENAME)
+
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+
+    def write_manifest(self, manifest):
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        with open(os.path.join(self.output_dir, MANIFEST_FILENAME), 'w') as f:
+            json.dump(manifest, f, indent=4, sort_keys=True)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from wagtail.wagtaildocs.models import Document
+
+from wagtailapi.models import DocumentMetadata
+
+
+class Command(BaseCommand):
+    help = "Stores the file size, content type and checksum of documents that don't have them yet"
+
+    def handle(self, **options):
+        updated = 0
+        missing_files = 0
+
+        documents = Document.objects.exclude(id__in=DocumentMetadata.objects.values('document_id'))
+        for document in documents.iterator():
+            metadata = DocumentMetadata(document=document)
+
+            try:
+                metadata.update_from_file()
+            except (IOError, OSError):
+                self.stdout.write("Missing file: %s (id: %d)" % (document.title, document.id))
+                missing_files += 1
+                continue
+
+            metadata.save()
+            updated += 1
+
+        self.stdout.write("%d documents updated, %d missing files" % (updated, missing_files))
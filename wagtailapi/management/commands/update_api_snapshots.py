@@ -0,0 +1,68 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail.wagtailcore.models import Page
+
+from wagtailapi.api import PagesAPIEndpoint
+from wagtailapi.models import PageSnapshot
+
+
+class Command(BaseCommand):
+    help = "Creates or updates the API snapshots of all live pages"
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--verify',
+            action='store_true',
+            dest='verify',
+            default=False,
+            help="Check that the snapshots are up to date without changing them",
+        ),
+    )
+
+    def handle(self, **options):
+        endpoint = PagesAPIEndpoint()
+        verify = options['verify']
+
+        up_to_date = 0
+        updated = 0
+        problems = 0
+
+        for page in Page.objects.live().order_by('path').iterator():
+            page = page.specific
+            data = endpoint.serialize_snapshot(page)
+            stored_data = PageSnapshot.objects.filter(page_id=page.id).values_list('data', flat=True).first()
+
+            if data == stored_data:
+                up_to_date += 1
+                continue
+
+            if verify:
+                problems += 1
+                if stored_data is None:
+                    self.stdout.write("Missing snapshot: %s (id: %d)" % (page.title, page.id))
+                elif data is None:
+                    self.stdout.write("Snapshot of page outside of a site: %s (id: %d)" % (page.title, page.id))
+                else:
+                    self.stdout.write("Out of date snapshot: %s (id: %d)" % (page.title, page.id))
+            else:
+                endpoint.update_snapshot(page)
+                updated += 1
+
+        # Snapshots of pages that are no longer live
+        orphaned_snapshots = PageSnapshot.objects.exclude(page__live=True)
+        if verify:
+            for page_id in orphaned_snapshots.values_list('page_id', flat=True):
+                self.stdout.write("Snapshot of page that isn't live (id: %d)" % page_id)
+                problems += 1
+        else:
+            orphaned_snapshots.delete()
+
+        if verify:
+            self.stdout.write("%d snapshots are up to date" % up_to_date)
+
+            if problems:
+                raise CommandError("%d snapshots need updating" % problems)
+        else:
+            self.stdout.write("%d snapshots updated, %d already up to date" % (updated, up_to_date))
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0010_change_page_owner_to_null_on_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageSnapshot',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', auto_created=True, primary_key=True, serialize=False)),
+                ('data', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now=True)),
+                ('page', models.OneToOneField(related_name='+', to='wagtailcore.Page')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
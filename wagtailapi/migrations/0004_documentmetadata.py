@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtaildocs', '0002_initial_data'),
+        ('wagtailapi', '0003_changeevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentMetadata',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', auto_created=True, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_size', models.BigIntegerField()),
+                ('content_type', models.CharField(max_length=255)),
+                ('checksum', models.CharField(max_length=64)),
+                ('document', models.OneToOneField(related_name='api_metadata', to='wagtaildocs.Document')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailapi', '0004_documentmetadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Modification',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', auto_created=True, primary_key=True, serialize=False)),
+                ('endpoint', models.CharField(max_length=255)),
+                ('object_id', models.PositiveIntegerField()),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='modification',
+            unique_together=set([('endpoint', 'object_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='modification',
+            index_together=set([('endpoint', 'modified_at')]),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import datetime
+
+from django.db import models, migrations
+from django.conf import settings
+from django.utils import timezone
+
+
+def record_recently_changed_pages(apps, schema_editor):
+    # Pages used to be found by "latest_revision_created_at". Record the pages
+    # that would have been found that way so clients that are already syncing
+    # don't miss them. This may include some pages that haven't changed.
+    Page = apps.get_model('wagtailcore', 'Page')
+    Modification = apps.get_model('wagtailapi', 'Modification')
+
+    now = timezone.now()
+    retention_days = getattr(settings, 'WAGTAILAPI_SYNC_RETENTION_DAYS', 30)
+    page_ids = Page.objects.filter(
+        latest_revision_created_at__gte=now - datetime.timedelta(days=retention_days)
+    ).values_list('id', flat=True)
+
+    Modification.objects.bulk_create([
+        Modification(endpoint='pages', object_id=page_id, modified_at=now)
+        for page_id in page_ids
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0010_change_page_owner_to_null_on_delete'),
+        ('wagtailapi', '0005_modification'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_recently_changed_pages),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailapi', '0006_page_modifications'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changeevent',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,97 @@
+import hashlib
+import mimetypes
+
+from django.db import models
+
+
+class PageSnapshot(models.Model):
+    """
+    A copy of the API detail document of a page, serialised when the page
+    is published. This is used by the pages detail view instead of
+    serialising the page on every request.
+    """
+    page = models.OneToOneField('wagtailcore.Page', related_name='+')
+    data = models.TextField()
+    created_at = models.DateTimeField(auto_now=True)
+
+
+class Tombstone(models.Model):
+    """
+    A record of an object that has been removed from an endpoint (for
+    example, a page being unpublished or an image being deleted). These let
+    clients that sync with "changed_since" find out what to remove.
+    """
+    endpoint = models.CharField(max_length=255)
+    object_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        index_together = [
+            ('endpoint', 'deleted_at'),
+        ]
+
+
+class Modification(models.Model):
+    """
+    A record of the last time an object was saved (or for pages, published
+    or moved). These let clients that sync with "changed_since" find out
+    about objects that have been edited.
+    """
+    endpoint = models.CharField(max_length=255)
+    object_id = models.PositiveIntegerField()
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [
+            ('endpoint', 'object_id'),
+        ]
+        index_together = [
+            ('endpoint', 'modified_at'),
+        ]
+
+
+class ChangeEvent(models.Model):
+    """
+    An event in the change feed. These are stored by the DatabaseBroker.
+    """
+    endpoint = models.CharField(max_length=255)
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(max_length=255)
+
+    # Old events are removed by the DatabaseBroker whenever one is published
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class DocumentMetadata(models.Model):
+    """
+    Details of a document's file that are worked out when the document is
+    saved so that the documents endpoint doesn't need to read the file
+    from storage.
+    """
+    document = models.OneToOneField('wagtaildocs.Document', related_name='api_metadata')
+    file_name = models.CharField(max_length=255)
+    file_size = models.BigIntegerField()
+    content_type = models.CharField(max_length=255)
+    checksum = models.CharField(max_length=64)
+
+    def update_from_file(self):
+        """
+        Reads the document's file to find its size and checksum. The content
+        type is guessed from the file name.
+        """
+        document_file = self.document.file
+        checksum = hashlib.sha256()
+        file_size = 0
+
+        document_file.open('rb')
+        try:
+            for chunk in document_file.chunks():
+                checksum.update(chunk)
+                file_size += len(chunk)
+        finally:
+            document_file.close()
+
+        self.file_name = document_file.name
+        self.file_size = file_size
+        self.content_type = mimetypes.guess_type(document_file.name)[0] or 'application/octet-stream'
+        self.checksum = checksum.hexdigest()
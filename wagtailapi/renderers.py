@@ -0,0 +1,133 @@
+import json
+from collections import OrderedDict
+
+import six
+
+from taggit.managers import _TaggableManager
+from taggit.models import Tag
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+class WagtailAPIJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        if isinstance(o, _TaggableManager):
+            return list(o.all())
+        elif isinstance(o, Tag):
+            return o.name
+        else:
+            return super(WagtailAPIJSONEncoder, self).default(o)
+
+
+_json_encoder = WagtailAPIJSONEncoder()
+
+
+def simplify_api_data(data):
+    """
+    Converts everything in the data that isn't a dict, list, string, number,
+    boolean or None the same way that WagtailAPIJSONEncoder does (eg, dates
+    become ISO 8601 strings and tags become their names). This makes the
+    binary formats give exactly the same values as JSON.
+    """
+    if isinstance(data, dict):
+        return OrderedDict((key, simplify_api_data(value)) for key, value in data.items())
+    elif isinstance(data, (list, tuple)):
+        return [simplify_api_data(value) for value in data]
+    elif data is None or isinstance(data, (six.string_types, six.binary_type, bool, float) + six.integer_types):
+        return data
+    else:
+        return simplify_api_data(_json_encoder.default(data))
+
+
+class JSONRenderer(object):
+    media_type = 'application/json'
+    media_type_aliases = ()
+
+    def render(self, data):
+        return json.dumps(data, indent=4, cls=WagtailAPIJSONEncoder)
+
+    def parse(self, content):
+        return json.loads(content.decode('UTF-8'), object_pairs_hook=OrderedDict)
+
+
+class MessagePackRenderer(object):
+    media_type = 'application/msgpack'
+    media_type_aliases = ('application/x-msgpack', )
+
+    def render(self, data):
+        return msgpack.packb(simplify_api_data(data), use_bin_type=True)
+
+    def parse(self, content):
+        return msgpack.unpackb(content, raw=False, object_pairs_hook=OrderedDict)
+
+
+class CBORRenderer(object):
+    media_type = 'application/cbor'
+    media_type_aliases = ()
+
+    def render(self, data):
+        return cbor2.dumps(simplify_api_data(data))
+
+    def parse(self, content):
+        return cbor2.loads(content)
+
+
+def get_renderers():
+    """
+    Returns the renderers that can be used, in order of preference
+    """
+    renderers = [JSONRenderer()]
+
+    if msgpack is not None:
+        renderers.append(MessagePackRenderer())
+
+    if cbor2 is not None:
+        renderers.append(CBORRenderer())
+
+    return renderers
+
+
+def get_renderer(request):
+    """
+    Returns the renderer for the best format that both the client and the
+    API support. This falls back to JSON if the client doesn't accept any of
+    them.
+    """
+    accepted_media_types = {}
+    for media_type in request.META.get('HTTP_ACCEPT', '').split(','):
+        media_type, _, params = media_type.strip().partition(';')
+        quality = 1.0
+
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                pass
+
+        accepted_media_types[media_type.strip().lower()] = quality
+
+    # Pick the supported format with the highest quality. Ties go to the
+    # renderer that comes first (JSON)
+    renderers = get_renderers()
+    best_renderer = renderers[0]
+    best_quality = 0
+    for renderer in renderers:
+        for media_type in (renderer.media_type, ) + renderer.media_type_aliases:
+            quality = accepted_media_types.get(media_type, accepted_media_types.get(media_type.split('/')[0] + '/*', accepted_media_types.get('*/*', 0)))
+
+            if quality > best_quality:
+                best_renderer = renderer
+                best_quality = quality
+
+    return best_renderer
@@ -1,15 +1,19 @@
 from django.core.urlresolvers import reverse
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils import timezone
 from django.conf import settings
 
 from wagtail.wagtailcore.signals import page_published, page_unpublished
-from wagtail.wagtailcore.models import PAGE_MODEL_CLASSES
+from wagtail.wagtailcore.models import Page, PAGE_MODEL_CLASSES
 from wagtail.wagtailimages.models import get_image_model
 from wagtail.wagtaildocs.models import Document
 
 from wagtail.contrib.wagtailfrontendcache.utils import purge_url_from_cache
 
-from .utils import get_base_url
+from .utils import get_base_url, expire_object_version, get_sync_window_start
+from .models import PageSnapshot, Tombstone, Modification, DocumentMetadata
+from .brokers import get_change_broker
+from .api import PagesAPIEndpoint
 
 
 def purge_page_from_cache(instance, **kwargs):
@@ -29,6 +33,184 @@ def purge_document_from_cache(instance, **kwargs):
         purge_url_from_cache(base_url + reverse('wagtailapi_v1_documents:detail', args=(instance.id, )))
 
 
+def remember_page_url_path(instance, **kwargs):
+    # Moving a page (or changing its slug) changes the url_path of the page
+    # and all of its descendants. Keep the old one to compare after the save
+    if instance.id is not None and not kwargs.get('raw', False):
+        instance._wagtailapi_old_url_path = Page.objects.filter(id=instance.id).values_list('url_path', flat=True).first()
+
+
+def get_moved_page_ids(instance, **kwargs):
+    """
+    Returns the ids of the page and its descendants if the page was just
+    moved or had its slug changed. Otherwise, this returns an empty list.
+    """
+    if kwargs.get('created', False) or kwargs.get('raw', False):
+        return []
+
+    old_url_path = getattr(instance, '_wagtailapi_old_url_path', None)
+    if old_url_path is None or old_url_path == instance.url_path:
+        return []
+
+    return list(Page.objects.descendant_of(instance, inclusive=True).values_list('id', flat=True))
+
+
+def update_page_snapshot(instance, **kwargs):
+    PagesAPIEndpoint().update_snapshot(instance.specific)
+
+
+def delete_page_snapshot(instance, **kwargs):
+    PageSnapshot.objects.filter(page_id=instance.id).delete()
+
+
+def delete_moved_page_snapshots(instance, **kwargs):
+    # The snapshots contain the URL and parent of each page. The descendants'
+    # url_paths are only updated after this signal so the snapshots can't be
+    # taken again here. The pages are serialised as normal until they are
+    # next published (or "update_api_snapshots" is run)
+    page_ids = get_moved_page_ids(instance, **kwargs)
+
+    if page_ids:
+        PageSnapshot.objects.filter(page_id__in=page_ids).delete()
+
+
+def expire_page_fragments(instance, **kwargs):
+    expire_object_version('pages', instance.id)
+
+
+def expire_image_fragments(instance, **kwargs):
+    expire_object_version('images', instance.id)
+
+
+def expire_document_fragments(instance, **kwargs):
+    expire_object_version('documents', instance.id)
+
+
+def add_tombstone(endpoint, object_id):
+    Tombstone.objects.create(endpoint=endpoint, object_id=object_id)
+
+    # Forget about objects that were removed before clients can sync from
+    Tombstone.objects.filter(endpoint=endpoint, deleted_at__lt=get_sync_window_start()).delete()
+
+
+def record_modifications(endpoint, object_ids):
+    object_ids = set(object_ids)
+    now = timezone.now()
+
+    Modification.objects.filter(endpoint=endpoint, object_id__in=object_ids).update(modified_at=now)
+
+    recorded_ids = set(Modification.objects.filter(endpoint=endpoint, object_id__in=object_ids).values_list('object_id', flat=True))
+    Modification.objects.bulk_create([
+        Modification(endpoint=endpoint, object_id=object_id, modified_at=now)
+        for object_id in object_ids - recorded_ids
+    ])
+
+    Modification.objects.filter(endpoint=endpoint, modified_at__lt=get_sync_window_start()).delete()
+
+
+def record_modification(endpoint, object_id):
+    record_modifications(endpoint, [object_id])
+
+
+def add_page_tombstone(instance, **kwargs):
+    add_tombstone('pages', instance.id)
+
+
+def remove_page_tombstones(instance, **kwargs):
+    # The page is back so clients must not remove it again
+    Tombstone.objects.filter(endpoint='pages', object_id=instance.id).delete()
+
+
+def record_page_modification(instance, **kwargs):
+    record_modification('pages', instance.id)
+
+
+def record_moved_page_modifications(instance, **kwargs):
+    page_ids = get_moved_page_ids(instance, **kwargs)
+
+    if page_ids:
+        record_modifications('pages', page_ids)
+
+
+def add_image_tombstone(instance, **kwargs):
+    add_tombstone('images', instance.id)
+    Modification.objects.filter(endpoint='images', object_id=instance.id).delete()
+
+
+def add_document_tombstone(instance, **kwargs):
+    add_tombstone('documents', instance.id)
+    Modification.objects.filter(endpoint='documents', object_id=instance.id).delete()
+
+
+def record_image_modification(instance, **kwargs):
+    # New objects are found by their created_at field
+    if kwargs.get('created', False) or kwargs.get('raw', False):
+        return
+
+    record_modification('images', instance.id)
+
+
+def record_document_modification(instance, **kwargs):
+    if kwargs.get('created', False) or kwargs.get('raw', False):
+        return
+
+    record_modification('documents', instance.id)
+
+
+def update_document_metadata(instance, **kwargs):
+    # Don't read files while loading fixtures
+    if kwargs.get('raw', False):
+        return
+
+    metadata = DocumentMetadata.objects.filter(document=instance).first()
+
+    # Only read the file if it has been replaced
+    if metadata is not None and metadata.file_name == instance.file.name:
+        return
+
+    if metadata is None:
+        metadata = DocumentMetadata(document=instance)
+
+    try:
+        metadata.update_from_file()
+    except (IOError, OSError):
+        # The file is missing
+        return
+
+    metadata.save()
+
+
+def publish_change(endpoint, object_id, action):
+    broker = get_change_broker()
+
+    if broker is not None:
+        broker.publish(endpoint, object_id, action)
+
+
+def publish_page_published_change(instance, **kwargs):
+    publish_change('pages', instance.id, 'published')
+
+
+def publish_page_unpublished_change(instance, **kwargs):
+    publish_change('pages', instance.id, 'unpublished')
+
+
+def publish_image_saved_change(instance, **kwargs):
+    publish_change('images', instance.id, 'saved')
+
+
+def publish_image_deleted_change(instance, **kwargs):
+    publish_change('images', instance.id, 'deleted')
+
+
+def publish_document_saved_change(instance, **kwargs):
+    publish_change('documents', instance.id, 'saved')
+
+
+def publish_document_deleted_change(instance, **kwargs):
+    publish_change('documents', instance.id, 'deleted')
+
+
 def register_signal_handlers():
     Image = get_image_model()
 
@@ -53,3 +235,123 @@ def unregister_signal_handlers():
     post_delete.disconnect(purge_image_from_cache, sender=Image)
     post_save.disconnect(purge_document_from_cache, sender=Document)
     post_delete.disconnect(purge_document_from_cache, sender=Document)
+
+
+def register_snapshot_signal_handlers():
+    for model in PAGE_MODEL_CLASSES:
+        page_published.connect(update_page_snapshot, sender=model)
+        page_unpublished.connect(delete_page_snapshot, sender=model)
+
+    # Moving a page saves it as a plain Page
+    for model in PAGE_MODEL_CLASSES + [Page]:
+        pre_save.connect(remember_page_url_path, sender=model, dispatch_uid='wagtailapi_snapshots')
+        post_save.connect(delete_moved_page_snapshots, sender=model)
+
+
+def unregister_snapshot_signal_handlers():
+    for model in PAGE_MODEL_CLASSES:
+        page_published.disconnect(update_page_snapshot, sender=model)
+        page_unpublished.disconnect(delete_page_snapshot, sender=model)
+
+    for model in PAGE_MODEL_CLASSES + [Page]:
+        pre_save.disconnect(remember_page_url_path, sender=model, dispatch_uid='wagtailapi_snapshots')
+        post_save.disconnect(delete_moved_page_snapshots, sender=model)
+
+
+def register_fragment_cache_signal_handlers():
+    Image = get_image_model()
+
+    for model in PAGE_MODEL_CLASSES:
+        page_published.connect(expire_page_fragments, sender=model)
+        page_unpublished.connect(expire_page_fragments, sender=model)
+        post_save.connect(expire_page_fragments, sender=model)
+
+    # Moving a page saves it as a plain Page
+    post_save.connect(expire_page_fragments, sender=Page)
+
+    post_save.connect(expire_image_fragments, sender=Image)
+    post_delete.connect(expire_image_fragments, sender=Image)
+    post_save.connect(expire_document_fragments, sender=Document)
+    post_delete.connect(expire_document_fragments, sender=Document)
+
+
+def unregister_fragment_cache_signal_handlers():
+    Image = get_image_model()
+
+    for model in PAGE_MODEL_CLASSES:
+        page_published.disconnect(expire_page_fragments, sender=model)
+        page_unpublished.disconnect(expire_page_fragments, sender=model)
+        post_save.disconnect(expire_page_fragments, sender=model)
+
+    post_save.disconnect(expire_page_fragments, sender=Page)
+
+    post_save.disconnect(expire_image_fragments, sender=Image)
+    post_delete.disconnect(expire_image_fragments, sender=Image)
+    post_save.disconnect(expire_document_fragments, sender=Document)
+    post_delete.disconnect(expire_document_fragments, sender=Document)
+
+
+def register_tombstone_signal_handlers():
+    Image = get_image_model()
+
+    for model in PAGE_MODEL_CLASSES + [Page]:
+        page_published.connect(remove_page_tombstones, sender=model)
+        page_published.connect(record_page_modification, sender=model)
+        page_unpublished.connect(add_page_tombstone, sender=model)
+        pre_save.connect(remember_page_url_path, sender=model)
+        post_save.connect(record_moved_page_modifications, sender=model)
+
+    post_delete.connect(add_image_tombstone, sender=Image)
+    post_delete.connect(add_document_tombstone, sender=Document)
+    post_save.connect(record_image_modification, sender=Image)
+    post_save.connect(record_document_modification, sender=Document)
+
+
+def unregister_tombstone_signal_handlers():
+    Image = get_image_model()
+
+    for model in PAGE_MODEL_CLASSES + [Page]:
+        page_published.disconnect(remove_page_tombstones, sender=model)
+        page_published.disconnect(record_page_modification, sender=model)
+        page_unpublished.disconnect(add_page_tombstone, sender=model)
+        pre_save.disconnect(remember_page_url_path, sender=model)
+        post_save.disconnect(record_moved_page_modifications, sender=model)
+
+    post_delete.disconnect(add_image_tombstone, sender=Image)
+    post_delete.disconnect(add_document_tombstone, sender=Document)
+    post_save.disconnect(record_image_modification, sender=Image)
+    post_save.disconnect(record_document_modification, sender=Document)
+
+
+def register_change_feed_signal_handlers():
+    Image = get_image_model()
+
+    for model in PAGE_MODEL_CLASSES:
+        page_published.connect(publish_page_published_change, sender=model)
+        page_unpublished.connect(publish_page_unpublished_change, sender=model)
+
+    post_save.connect(publish_image_saved_change, sender=Image)
+    post_delete.connect(publish_image_deleted_change, sender=Image)
+    post_save.connect(publish_document_saved_change, sender=Document)
+    post_delete.connect(publish_document_deleted_change, sender=Document)
+
+
+def unregister_change_feed_signal_handlers():
+    Image = get_image_model()
+
+    for model in PAGE_MODEL_CLASSES:
+        page_published.disconnect(publish_page_published_change, sender=model)
+        page_unpublished.disconnect(publish_page_unpublished_change, sender=model)
+
+    post_save.disconnect(publish_image_saved_change, sender=Image)
+    post_delete.disconnect(publish_image_deleted_change, sender=Image)
+    post_save.disconnect(publish_document_saved_change, sender=Document)
+    post_delete.disconnect(publish_document_deleted_change, sender=Document)
+
+
+def register_document_metadata_signal_handlers():
+    post_save.connect(update_document_metadata, sender=Document)
+
+
+def unregister_document_metadata_signal_handlers():
+    post_save.disconnect(update_document_metadata, sender=Document)
@@ -1,6 +1,24 @@
+import random
+import uuid
+import datetime
+
 from six.moves.urllib.parse import urlparse
 
 from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from django.utils import timezone
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from django.db.models import Min, Max, Count
+from django.db.models.query import QuerySet
+from django.contrib.contenttypes.models import ContentType
+
+from wagtail.wagtailcore.models import Site, PAGE_MODEL_CLASSES
 
 
 def get_base_url(request=None):
@@ -11,3 +29,383 @@ def get_base_url(request=None):
         base_url_parsed = urlparse(base_url)
 
         return base_url_parsed.scheme + '://' + base_url_parsed.netloc
+
+
+def get_api_cache():
+    """
+    Returns the cache that the API uses to store serialised objects
+    (or None if the API cache is disabled)
+    """
+    cache_name = getattr(settings, 'WAGTAILAPI_CACHE', None)
+
+    if cache_name:
+        return caches[cache_name]
+
+
+def get_object_version_key(endpoint_name, pk):
+    return 'wagtailapi:version:%s:%d' % (endpoint_name, pk)
+
+
+def get_object_versions(endpoint_name, pks):
+    """
+    Returns a dict of version stamps from the API cache for the objects
+    with the given ids. Objects that don't have a version stamp yet are
+    given a new one.
+
+    Everything that is cached for an object must include its version
+    stamp in the key. Expiring the version stamp then makes all of those
+    entries unreachable.
+
+    Version stamps use the default timeout of the cache, so entries for
+    objects that are no longer requested are eventually removed.
+    """
+    cache = get_api_cache()
+    keys = dict((pk, get_object_version_key(endpoint_name, pk)) for pk in pks)
+    cached_versions = cache.get_many(keys.values())
+
+    versions = {}
+    new_versions = {}
+    for pk, key in keys.items():
+        if key in cached_versions:
+            versions[pk] = cached_versions[key]
+        else:
+            versions[pk] = new_versions[key] = uuid.uuid4().hex
+
+    if new_versions:
+        cache.set_many(new_versions)
+
+    return versions
+
+
+def expire_object_version(endpoint_name, pk):
+    cache = get_api_cache()
+
+    if cache is not None:
+        cache.delete(get_object_version_key(endpoint_name, pk))
+
+
+def get_sync_retention_days():
+    """
+    Returns the number of days that records of removed and edited objects
+    are kept for clients that sync with "changed_since"
+    """
+    return getattr(settings, 'WAGTAILAPI_SYNC_RETENTION_DAYS', 30)
+
+
+def get_sync_window_start():
+    """
+    Returns the earliest time that "changed_since" can be set to. Records
+    from before this may have been removed.
+    """
+    return timezone.now() - datetime.timedelta(days=get_sync_retention_days())
+
+
+def get_site_for_page(page):
+    """
+    Returns the site that the page belongs to (or None if it isn't in a site)
+    """
+    for site_id, root_path, root_url in Site.get_site_root_paths():
+        if page.url_path.startswith(root_path):
+            return Site.objects.get(id=site_id)
+
+
+def get_site_root_paths(request):
+    """
+    Returns the root paths of all sites. These are only looked up once for
+    each request.
+    """
+    if not hasattr(request, '_wagtailapi_site_root_paths'):
+        request._wagtailapi_site_root_paths = Site.get_site_root_paths()
+
+    return request._wagtailapi_site_root_paths
+
+
+def get_page_html_url(page, site_root_paths):
+    """
+    Returns the full URL of a page on the site that it belongs to (or None
+    if it isn't in a site). This is worked out from the page's url_path so
+    it doesn't need any queries.
+    """
+    for site_id, root_path, root_url in site_root_paths:
+        if page.url_path.startswith(root_path):
+            return root_url + page.url_path[len(root_path) - 1:]
+
+
+# Maps the content type ids of page models to their type names (eg,
+# "demo.BlogPage"). Shared by all requests in the process.
+_page_type_names = {}
+
+
+def get_model_type_name(model):
+    return model._meta.app_label + '.' + model.__name__
+
+
+def refresh_page_type_names():
+    """
+    Rebuilds the map of content type ids to page type names with one query
+    """
+    content_types = ContentType.objects.get_for_models(*PAGE_MODEL_CLASSES)
+
+    _page_type_names.update(dict(
+        (content_type.id, get_model_type_name(model))
+        for model, content_type in content_types.items()
+    ))
+
+
+def get_page_type_name(content_type_id):
+    """
+    Returns the type name of pages with the given content type id
+
+    The map is built when it's first used and is rebuilt whenever it's asked
+    for a content type it doesn't know (eg, a page type that was added after
+    it was built).
+    """
+    if content_type_id not in _page_type_names:
+        refresh_page_type_names()
+
+        if content_type_id not in _page_type_names:
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            _page_type_names[content_type_id] = get_model_type_name(model)
+
+    return _page_type_names[content_type_id]
+
+
+def get_page_content_type_ids(models):
+    """
+    Returns the content type ids of pages that are instances of any of the
+    given models (including subclasses of them)
+    """
+    if not _page_type_names:
+        refresh_page_type_names()
+
+    type_names = set(
+        get_model_type_name(model)
+        for model in PAGE_MODEL_CLASSES
+        if issubclass(model, tuple(models))
+    )
+
+    return sorted(
+        content_type_id
+        for content_type_id, type_name in _page_type_names.items()
+        if type_name in type_names
+    )
+
+
+def get_results_window(results, start, stop):
+    """
+    Returns the results between start and stop along with the total number of
+    results.
+
+    Database querysets (which the database search backend also produces)
+    fetch the window and the total count in a single query. Search results
+    from other backends are counted separately, but only when the count
+    can't be worked out from the window itself.
+    """
+    if isinstance(results, QuerySet) and stop > start:
+        return get_queryset_window(results, start, stop)
+
+    window = list(results[start:stop])
+    return window, _get_total_count_from_window(results, window, start, stop)
+
+
+def get_queryset_window(queryset, start, stop):
+    """
+    Returns the rows of the queryset between start and stop along with the
+    total number of rows in a single query.
+
+    The count is selected alongside every row as an uncorrelated subquery,
+    which databases evaluate once. Use the "benchmark_api_pagination"
+    management command to compare this with a separate count on your own
+    database.
+    """
+    count_sql, count_params = queryset.order_by().values('pk').query.sql_with_params()
+    window = list(queryset.extra(
+        select={'_api_total_count': 'SELECT COUNT(*) FROM (%s) AS api_total_count' % count_sql},
+        select_params=count_params,
+    )[start:stop])
+
+    if window:
+        return window, window[0]._api_total_count
+
+    return window, _get_total_count_from_window(queryset, window, start, stop)
+
+
+def _get_total_count_from_window(results, window, start, stop):
+    # Nothing was fetched so the window doesn't tell us anything (eg, limit=0)
+    if stop <= start:
+        return results.count()
+
+    # If the window isn't full, it must contain the last result
+    if window and len(window) < stop - start:
+        return start + len(window)
+
+    # No results at all
+    if not window and start == 0:
+        return 0
+
+    return results.count()
+
+
+# Querysets with up to this many rows are sampled by shuffling all of their ids
+RANDOM_SAMPLE_SHUFFLE_MAX = 1000
+
+# The number of rows each round of random id lookups aims to find
+RANDOM_SAMPLE_BATCH_SIZE = 50
+
+# The maximum number of ids to look up in a single random sampling query
+RANDOM_SAMPLE_MAX_PROBES = 1000
+
+# How many rounds of random id lookups to make before falling back to
+# probing id ranges one row at a time
+RANDOM_SAMPLE_MAX_ROUNDS = 5
+
+
+def get_random_window(queryset, start, stop, seed=None):
+    """
+    Returns the results between start and stop from a random ordering of
+    the queryset along with the total number of results.
+
+    This samples random ids from the range of ids in the queryset rather
+    than using ORDER BY RANDOM(), which would sort the entire table on
+    every request. The sample is determined by the seed so, as long as the
+    data doesn't change, the same seed always gives the same ordering.
+    """
+    stats = queryset.order_by().aggregate(min_id=Min('pk'), max_id=Max('pk'), total_count=Count('pk'))
+    total_count = stats['total_count']
+
+    if start >= total_count:
+        return [], total_count
+
+    sample = _sample_ids(queryset, random.Random(seed), stats['min_id'], stats['max_id'], total_count, min(stop, total_count))
+    window_ids = sample[start:stop]
+    objects = queryset.in_bulk(window_ids)
+
+    return [objects[pk] for pk in window_ids if pk in objects], total_count
+
+
+def _sample_ids(queryset, rng, min_id, max_id, total_count, size):
+    # Note: The order that ids are sampled in must not depend on "size" so
+    # that smaller samples are always the start of larger ones. Otherwise,
+    # the pages of a seeded ordering wouldn't line up.
+
+    # Small querysets can be sampled by shuffling all of their ids
+    if total_count <= RANDOM_SAMPLE_SHUFFLE_MAX:
+        ids = sorted(queryset.values_list('pk', flat=True))
+        rng.shuffle(ids)
+        return ids[:size]
+
+    sample = []
+    seen = set()
+
+    # Look up batches of random ids. The batches are oversampled according
+    # to how densely packed the ids are to make up for the gaps.
+    density = float(total_count) / (max_id - min_id + 1)
+    probe_count = min(int(RANDOM_SAMPLE_BATCH_SIZE / density) + 1, RANDOM_SAMPLE_MAX_PROBES)
+
+    for i in range(RANDOM_SAMPLE_MAX_ROUNDS):
+        if len(sample) >= size:
+            break
+
+        probes = [rng.randint(min_id, max_id) for j in range(probe_count)]
+        found = set(queryset.filter(pk__in=probes).values_list('pk', flat=True))
+
+        for pk in probes:
+            if pk in found and pk not in seen:
+                seen.add(pk)
+                sample.append(pk)
+
+    # If the ids are too sparse, probe random id ranges for the rest. This
+    # picks the first row that hasn't been sampled yet at or after a random
+    # id, wrapping around to the start of the table.
+    while len(sample) < size:
+        remaining_rows = queryset.exclude(pk__in=seen).order_by('pk').values_list('pk', flat=True)
+        probe = rng.randint(min_id, max_id)
+        pks = list(remaining_rows.filter(pk__gte=probe)[:1]) or list(remaining_rows[:1])
+
+        seen.add(pks[0])
+        sample.append(pks[0])
+
+    return sample[:size]
+
+
+# Responses smaller than this aren't worth compressing
+COMPRESSION_MIN_LENGTH = 200
+
+
+def get_accepted_encoding(request):
+    """
+    Returns the best content encoding that both the client and the API
+    support (or None if there isn't one)
+    """
+    accepted_encodings = {}
+    for encoding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        encoding, _, params = encoding.strip().partition(';')
+        quality = 1.0
+
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                pass
+
+        accepted_encodings[encoding.strip().lower()] = quality
+
+    supported_encodings = ['gzip']
+    if brotli is not None:
+        supported_encodings.insert(0, 'br')
+
+    # Pick the supported encoding with the highest quality. Ties go to the
+    # encoding that comes first in supported_encodings.
+    best_encoding = None
+    best_quality = 0
+    for encoding in supported_encodings:
+        quality = accepted_encodings.get(encoding, accepted_encodings.get('*', 0))
+
+        if quality > best_quality:
+            best_encoding = encoding
+            best_quality = quality
+
+    return best_encoding
+
+
+def compress_string_with_encoding(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content)
+    else:
+        return compress_string(content)
+
+
+def compress_response(request, response):
+    """
+    Compresses the response with gzip or brotli if the client supports it
+
+    If the response has a "wagtailapi_cache_key" attribute, the compressed
+    body is stored in the API cache under that key so that it only needs
+    to be compressed once.
+    """
+    patch_vary_headers(response, ('Accept-Encoding', ))
+
+    if response.streaming or response.has_header('Content-Encoding') or len(response.content) < COMPRESSION_MIN_LENGTH:
+        return
+
+    encoding = get_accepted_encoding(request)
+    if encoding is None:
+        return
+
+    cache = get_api_cache()
+    cache_key = getattr(response, 'wagtailapi_cache_key', None)
+
+    if cache is not None and cache_key is not None:
+        cache_key += ':' + encoding
+        content = cache.get(cache_key)
+
+        if content is None:
+            content = compress_string_with_encoding(response.content, encoding)
+            cache.set(cache_key, content)
+    else:
+        content = compress_string_with_encoding(response.content, encoding)
+
+    response.content = content
+    response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(response.content))